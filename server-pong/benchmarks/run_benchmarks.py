@@ -0,0 +1,329 @@
+"""
+Benchmarks dos caminhos quentes do jogo, com N partidas simultâneas.
+
+    python benchmarks/run_benchmarks.py                      # 10/100/1000 partidas, Redis em memória
+    python benchmarks/run_benchmarks.py --redis local        # Redis de REDIS_HOST/REDIS_PORT (inclui channels_redis)
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+
+Cada caso mede o custo médio por operação (µs). O resultado é gravado em JSON
+(por padrão em benchmarks/results/<commit>.json) para comparar commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "setup.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from setup.redis_pool import InstrumentedConnectionPool, install_pool  # noqa: E402
+from game.game_consumer import GameConsumer  # noqa: E402
+from game.match_engine import (  # noqa: E402
+    LiveMatch, broadcast_payload, build_delta, match_engine, step_ball,
+)
+from game.match_state import MatchState  # noqa: E402
+from game.match_store import join_match, leave_match  # noqa: E402
+from game.wire import FRAME_DELTA, apply_delta, encode_state_frame  # noqa: E402
+
+RESULTS_DIR = os.path.join(BASE_DIR, "benchmarks", "results")
+TARGET_OPS = 20000  # operações por caso, divididas entre as partidas
+
+
+def rounds_for(matches):
+    return max(5, TARGET_OPS // matches)
+
+
+def random_state(rng):
+    return MatchState(
+        players={"1": "left", "2": "right"},
+        initial_players=["1", "2"],
+        paddle_left=rng.uniform(0, 500),
+        paddle_right=rng.uniform(0, 500),
+        ball_x=rng.uniform(50, 750),
+        ball_y=rng.uniform(50, 550),
+        ball_speed_x=rng.choice((-1, 1)) * rng.uniform(150, 400),
+        ball_speed_y=rng.uniform(-300, 300),
+    )
+
+
+def timed(total_ops, started):
+    elapsed = time.perf_counter() - started
+    return {"us_per_op": elapsed / total_ops * 1e6, "ops_per_second": total_ops / elapsed, "ops": total_ops}
+
+
+def bench_step(matches, rng):
+    """
+    Um passo de física por partida (`step_ball`) e o passo vetorizado do modo em lote.
+    """
+    dt = 1 / settings.GAME_ENGINE["TICK_RATE"]
+    rounds = rounds_for(matches)
+    states = [random_state(rng) for _ in range(matches)]
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for state in states:
+            step_ball(state, dt)
+    results = {"scalar": timed(rounds * matches, started)}
+
+    try:
+        from game.batch_physics import BatchSimulation
+    except ImportError:
+        return results
+    batch = BatchSimulation()
+    for index, state in enumerate(states):
+        batch.add(str(index), state)
+        batch.set_active(str(index), True)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        batch.step(dt)
+    results["batch"] = timed(rounds * matches, started)
+    return results
+
+
+def bench_serialize(matches, rng):
+    """
+    Montagem do payload, delta, JSON e quadro binário de um envio por partida.
+    """
+    dt = 1 / settings.GAME_ENGINE["TICK_RATE"]
+    rounds = rounds_for(matches)
+    states = [random_state(rng) for _ in range(matches)]
+    acks = {"left": 0, "right": 0}
+    previous = [broadcast_payload(state, 0, acks) for state in states]
+    frames = []
+    for tick in range(1, rounds + 1):
+        # Um jogador com entradas confirmadas a cada envio
+        acks = {"left": tick, "right": 0}
+        for state in states:
+            step_ball(state, dt)
+        frames.append([broadcast_payload(state, tick, acks) for state in states])
+
+    started = time.perf_counter()
+    for tick in range(1, rounds + 1):
+        for state in states:
+            broadcast_payload(state, tick, acks)
+    payload = timed(rounds * matches, started)
+
+    started = time.perf_counter()
+    deltas = []
+    last = list(previous)
+    for payloads in frames:
+        row = []
+        for index, current in enumerate(payloads):
+            row.append(build_delta(last[index], current))
+            last[index] = current
+        deltas.append(row)
+    delta = timed(rounds * matches, started)
+
+    started = time.perf_counter()
+    for row in deltas:
+        for item in row:
+            json.dumps({"type": "state_delta", "state": item})
+    delta_json = timed(rounds * matches, started)
+
+    started = time.perf_counter()
+    for payloads in frames:
+        for current in payloads:
+            json.dumps({"type": "state_update", "state": current})
+    keyframe_json = timed(rounds * matches, started)
+
+    started = time.perf_counter()
+    base = list(previous)
+    for row in deltas:
+        for index, item in enumerate(row):
+            base[index] = apply_delta(base[index], item)
+            encode_state_frame(base[index], FRAME_DELTA)
+    binary = timed(rounds * matches, started)
+
+    return {
+        "payload": payload,
+        "delta": delta,
+        "delta_json": delta_json,
+        "keyframe_json": keyframe_json,
+        "binary_frame": binary,
+    }
+
+
+async def bench_receive(matches, rng):
+    """
+    `GameConsumer.receive` de um player_move até a fila de entradas do engine local.
+    """
+    rounds = rounds_for(matches)
+    consumers = []
+    for index in range(matches):
+        match_id = f"bench{index}"
+        match_engine.matches[match_id] = LiveMatch(match_id, random_state(rng))
+        consumer = GameConsumer()
+        consumer.match_id = match_id
+        consumer.user_id = 1
+        consumer.assigned_side = "left"
+        consumer.channel_name = f"bench.{index}"
+        consumers.append(consumer)
+
+    messages = [json.dumps({"type": "player_move", "direction": "up", "seq": seq}) for seq in range(1, rounds + 1)]
+    try:
+        started = time.perf_counter()
+        for text in messages:
+            for consumer in consumers:
+                await consumer.receive(text)
+        result = timed(rounds * matches, started)
+    finally:
+        for index in range(matches):
+            match_engine.matches.pop(f"bench{index}", None)
+    return result
+
+
+async def bench_send(matches, rng, channel_layer):
+    """
+    `group_send` de um quadro por partida para um grupo com os dois jogadores.
+    """
+    rounds = max(3, rounds_for(matches) // 10)
+    groups = [f"bench_match_{index}" for index in range(matches)]
+    for group in groups:
+        for _ in range(2):
+            await channel_layer.group_add(group, await channel_layer.new_channel())
+    payload = broadcast_payload(random_state(rng), 1)
+    event = {"type": "game_update", "message_type": "state_update", "state": payload}
+
+    elapsed = 0.0
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for group in groups:
+            await channel_layer.group_send(group, event)
+        elapsed += time.perf_counter() - started
+        # Esvazia as filas fora da medição, para não estourar a capacidade dos canais
+        await channel_layer.flush()
+        for group in groups:
+            for _ in range(2):
+                await channel_layer.group_add(group, await channel_layer.new_channel())
+    await channel_layer.flush()
+    ops = rounds * matches
+    return {"us_per_op": elapsed / ops * 1e6, "ops_per_second": ops / elapsed, "ops": ops}
+
+
+async def bench_slots(matches, rng):
+    """
+    Reserva e liberação de lados pelos scripts Lua de conexão/desconexão.
+    """
+    rounds = max(3, rounds_for(matches) // 20)
+    elapsed_join = elapsed_leave = 0.0
+    for round_index in range(rounds):
+        ids = [f"bench{round_index}-{index}" for index in range(matches)]
+        started = time.perf_counter()
+        await asyncio.gather(*(join_match(match_id, user_id) for match_id in ids for user_id in (1, 2)))
+        elapsed_join += time.perf_counter() - started
+        started = time.perf_counter()
+        await asyncio.gather(*(leave_match(match_id, user_id) for match_id in ids for user_id in (1, 2)))
+        elapsed_leave += time.perf_counter() - started
+    ops = rounds * matches * 2
+    return {
+        "join": {"us_per_op": elapsed_join / ops * 1e6, "ops_per_second": ops / elapsed_join, "ops": ops},
+        "leave": {"us_per_op": elapsed_leave / ops * 1e6, "ops_per_second": ops / elapsed_leave, "ops": ops},
+    }
+
+
+async def run_suite(sizes, redis_mode):
+    from channels.layers import InMemoryChannelLayer
+
+    if redis_mode == "fake":
+        import fakeredis
+        install_pool(InstrumentedConnectionPool(
+            connection_class=fakeredis.aioredis.FakeConnection,
+            server=fakeredis.FakeServer(),
+            decode_responses=True,
+            max_connections=settings.REDIS_POOL["MAX_CONNECTIONS"],
+            timeout=settings.REDIS_POOL["TIMEOUT"],
+        ))
+    layers = {"in_memory": InMemoryChannelLayer(capacity=1000000)}
+    if redis_mode == "local":
+        from channels_redis.core import RedisChannelLayer
+        layers["channels_redis"] = RedisChannelLayer(
+            hosts=[(settings.REDIS_HOST, settings.REDIS_PORT)], prefix="bench", capacity=1000000,
+        )
+
+    results = {}
+    for matches in sizes:
+        rng = random.Random(matches)
+        print(f"{matches} partidas...", file=sys.stderr)
+        results[str(matches)] = {
+            "step": bench_step(matches, rng),
+            "serialize": bench_serialize(matches, rng),
+            "receive_move": await bench_receive(matches, rng),
+            "group_send": {name: await bench_send(matches, rng, layer) for name, layer in layers.items()},
+            "slots": await bench_slots(matches, rng),
+        }
+    return results
+
+
+def flatten(results, prefix=""):
+    """
+    {"10.step.scalar": µs/op, ...} para comparar dois arquivos de resultado.
+    """
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and "us_per_op" in value:
+            flat[name] = value["us_per_op"]
+        elif isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+    return flat
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos quentes do jogo.")
+    parser.add_argument("--matches", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--redis", choices=("fake", "local"), default="fake",
+                        help="fake: Redis em memória (fakeredis); local: REDIS_HOST/REDIS_PORT.")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/<commit>.json).")
+    parser.add_argument("--compare", help="Resultado anterior para comparar (mostra a variação de cada caso).")
+    args = parser.parse_args()
+
+    settings.GAME_ENGINE["KEY_PREFIX"] = "bench"
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "redis": args.redis,
+        "tick_rate": settings.GAME_ENGINE["TICK_RATE"],
+        "results": asyncio.run(run_suite(args.matches, args.redis)),
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+
+    current = flatten(report["results"])
+    previous = {}
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            previous = flatten(json.load(baseline_file)["results"])
+    for name, value in current.items():
+        line = f"{name:45s} {value:10.2f} µs/op"
+        if name in previous:
+            line += f"  ({(value / previous[name] - 1) * 100:+.1f}%)"
+        print(line)
+    print(f"Resultado gravado em {output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import json
+import redis
 from channels.generic.websocket import AsyncWebsocketConsumer
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from asgiref.sync import sync_to_async
-from django.core.cache import cache
+
+from setup.redis_pool import get_redis
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -54,40 +56,59 @@ class ChatConsumer(AsyncWebsocketConsumer):
             "display_name": event["display_name"],
         }))
 
-    @sync_to_async
-    def get_user_data(self, user_id):
+    async def get_user_data(self, user_id):
         """
-        Busca os dados do usuário do banco de dados. Usa cache para melhorar o desempenho.
+        Busca os dados do usuário. Usa o Redis compartilhado como cache para melhorar o desempenho.
         """
-        from django.contrib.auth import get_user_model
-        User = get_user_model()  # Define o modelo de usuário localmente
-
-        cache_key = f"user_data_{user_id}"
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return cached_data
+        cache_key = f"{settings.GAME_ENGINE['KEY_PREFIX']}:user_data:{user_id}"
+        redis_client = get_redis()
 
         try:
-            user = User.objects.only("avatar", "display_name").get(id=user_id)
-            avatar_url = user.avatar if user.avatar else "avatars/default.png"
+            cached_data = await redis_client.get(cache_key)
+        except redis.RedisError as e:
+            print(f"Erro ao ler cache do usuário {user_id} no Redis: {e}")
+            cached_data = None
 
-            # Ajusta o caminho do avatar padrão
-            if avatar_url == "avatars/default.png":
-                avatar_url = f"{settings.MEDIA_URL}avatars/default.png"
-            else:
-                avatar_url = f"{settings.MEDIA_URL}{avatar_url}"
+        if cached_data:
+            return json.loads(cached_data)
 
-            user_data = {
-                "avatar": avatar_url,
-                "display_name": user.display_name or f"Usuário {user_id}",
-            }
-            # Armazena no cache por 1 hora
-            cache.set(cache_key, user_data, timeout=3600)
-            return user_data
-        except User.DoesNotExist:
+        user_data = await self.load_user_data(user_id)
+        if user_data is None:
             # Caso o usuário não seja encontrado
             return {
                 "avatar": f"{settings.MEDIA_URL}avatars/default.png",
                 "display_name": f"Usuário Desconhecido",
             }
+
+        try:
+            # Armazena no cache por 1 hora
+            await redis_client.set(cache_key, json.dumps(user_data), ex=3600)
+        except redis.RedisError as e:
+            print(f"Erro ao gravar cache do usuário {user_id} no Redis: {e}")
+        return user_data
+
+    @sync_to_async
+    def load_user_data(self, user_id):
+        """
+        Busca os dados do usuário no banco de dados.
+        """
+        from django.contrib.auth import get_user_model
+        User = get_user_model()  # Define o modelo de usuário localmente
+
+        try:
+            user = User.objects.only("avatar", "display_name").get(id=user_id)
+        except User.DoesNotExist:
+            return None
+
+        avatar_url = user.avatar if user.avatar else "avatars/default.png"
+
+        # Ajusta o caminho do avatar padrão
+        if avatar_url == "avatars/default.png":
+            avatar_url = f"{settings.MEDIA_URL}avatars/default.png"
+        else:
+            avatar_url = f"{settings.MEDIA_URL}{avatar_url}"
+
+        return {
+            "avatar": avatar_url,
+            "display_name": user.display_name or f"Usuário {user_id}",
+        }
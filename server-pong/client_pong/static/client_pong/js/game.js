@@ -61,6 +61,21 @@
       let pendingState = null;
       let isPaused = false;
       let moveInterval = null;
+      // Taxas informadas pelo servidor em "assigned_side"
+      let tickRate = 60;
+      let broadcastRate = 30;
+      // Protocolo de deltas: último estado completo e sua sequência
+      let currentState = null;
+      let lastSeq = null;
+      let resyncRequested = false;
+      // Sequência dos comandos de movimento enviados ao servidor
+      let inputSeq = 0;
+      // Predição local da própria raquete: movimentos ainda não confirmados
+      // pelo servidor (campo "acks" do estado) e a posição prevista
+      let paddleMaxSpeed = 600;
+      let pendingInputs = [];
+      let predictedPaddle = null;
+      let lastMoveSent = 0;
 
       // Função que define o core do jogo: renderização do canvas
       const gameCore = (canvas) => {
@@ -109,7 +124,102 @@
           ctx.fill();
         };
 
-        return { renderState, clearCanvas };
+        // O servidor simula em tickRate mas envia só broadcastRate snapshots por
+        // segundo; desenhamos com um pequeno atraso, interpolando entre eles.
+        const snapshots = [];
+        let clockOffset = null;
+        let animationId = null;
+
+        const lerp = (a, b, t) => a + (b - a) * t;
+
+        // A própria raquete é desenhada na posição prevista, sem o atraso da interpolação
+        const withPrediction = (state) => {
+          if (predictedPaddle === null || !assignedSide) return state;
+          return { ...state, paddles: { ...state.paddles, [assignedSide]: predictedPaddle } };
+        };
+
+        const interpolate = (older, newer, t) => {
+          // Bola reposicionada após ponto: não interpola o "teletransporte"
+          if (Math.abs(newer.ball.x - older.ball.x) > canvas.width / 4) {
+            return newer;
+          }
+          return {
+            ...newer,
+            ball: {
+              ...newer.ball,
+              x: lerp(older.ball.x, newer.ball.x, t),
+              y: lerp(older.ball.y, newer.ball.y, t),
+            },
+            paddles: {
+              left: lerp(older.paddles.left, newer.paddles.left, t),
+              right: lerp(older.paddles.right, newer.paddles.right, t),
+            },
+          };
+        };
+
+        const renderFrame = () => {
+          animationId = null;
+          if (!snapshots.length) return;
+
+          const interpolationDelay = (2 * 1000) / broadcastRate;
+          const renderTime = performance.now() - clockOffset - interpolationDelay;
+          let older = snapshots[0];
+          let newer = null;
+          for (const snapshot of snapshots) {
+            if (snapshot.time <= renderTime) {
+              older = snapshot;
+            } else {
+              newer = snapshot;
+              break;
+            }
+          }
+
+          if (!newer || newer === older) {
+            renderState(withPrediction(older.state));
+          } else {
+            const t = (renderTime - older.time) / (newer.time - older.time);
+            renderState(withPrediction(interpolate(older.state, newer.state, t)));
+          }
+
+          // Sem snapshots novos há mais de 1s (pausa): para o loop até o próximo
+          const newest = snapshots[snapshots.length - 1];
+          if (renderTime - newest.time < 1000) {
+            animationId = requestAnimationFrame(renderFrame);
+          }
+        };
+
+        const pushSnapshot = (state) => {
+          if (typeof state.tick !== "number") {
+            // Estado sem tick (ex.: enviado na conexão): desenha direto
+            snapshots.length = 0;
+            clockOffset = null;
+            renderState(state);
+            return;
+          }
+
+          const serverTime = (state.tick / tickRate) * 1000;
+          const last = snapshots[snapshots.length - 1];
+          if (last && serverTime <= last.time) {
+            // Tick reiniciado (partida assumida por outro worker): recomeça o buffer
+            snapshots.length = 0;
+            clockOffset = null;
+          }
+
+          // Menor atraso observado entre o relógio do servidor e o local,
+          // subindo devagar para acompanhar a deriva dos relógios.
+          const offset = performance.now() - serverTime;
+          clockOffset = clockOffset === null ? offset : Math.min(offset, clockOffset + 1);
+
+          snapshots.push({ time: serverTime, state });
+          if (snapshots.length > 30) {
+            snapshots.shift();
+          }
+          if (!animationId) {
+            animationId = requestAnimationFrame(renderFrame);
+          }
+        };
+
+        return { renderState, clearCanvas, pushSnapshot };
       };
 
       // Função para renderizar informações dos jogadores
@@ -174,16 +284,108 @@
         }
       }
 
+      // Aplica um state_delta (só os campos alterados) sobre o último estado
+      function applyDelta(base, delta) {
+        const next = { ...base };
+        Object.entries(delta).forEach(([key, value]) => {
+          next[key] = value && typeof value === "object" && !Array.isArray(value)
+            ? { ...base[key], ...value }
+            : value;
+        });
+        return next;
+      }
+
+      // Pede um keyframe ao servidor (uma vez até ele chegar)
+      function requestResync() {
+        if (resyncRequested || !socket || socket.readyState !== WebSocket.OPEN) return;
+        resyncRequested = true;
+        socket.send(JSON.stringify({ type: "resync" }));
+      }
+
+      // Quadro binário de estado (ver game/wire.py): 27 bytes little-endian
+      // com posições quantizadas em uint16 e a física sempre completa.
+      const FIELD_WIDTH = 800;
+      const FIELD_HEIGHT = 600;
+      const QUANT_MAX = 65535;
+      const FRAME_STATE = 0;
+
+      function decodeStateFrame(buffer) {
+        const view = new DataView(buffer);
+        const kind = view.getUint8(0);
+        return {
+          seq: view.getUint32(1, true),
+          tick: kind === FRAME_STATE ? undefined : view.getUint32(5, true),
+          ball: {
+            x: (view.getUint16(9, true) / QUANT_MAX) * FIELD_WIDTH,
+            y: (view.getUint16(11, true) / QUANT_MAX) * FIELD_HEIGHT,
+          },
+          paddles: {
+            left: (view.getUint16(13, true) / QUANT_MAX) * FIELD_HEIGHT,
+            right: (view.getUint16(15, true) / QUANT_MAX) * FIELD_HEIGHT,
+          },
+          scores: {
+            left: view.getUint8(17),
+            right: view.getUint8(18),
+          },
+          acks: {
+            left: view.getUint32(19, true),
+            right: view.getUint32(23, true),
+          },
+        };
+      }
+
+      // Mesmo movimento aplicado pelo servidor (apply_input em game/match_engine.py)
+      const PADDLE_STEP = 10;
+      const PADDLE_HEIGHT = 100;
+
+      function movePaddle(position, direction) {
+        const next = position + (direction === "up" ? -PADDLE_STEP : PADDLE_STEP);
+        return Math.max(0, Math.min(FIELD_HEIGHT - PADDLE_HEIGHT, next));
+      }
+
+      // Parte da posição confirmada pelo servidor e reaplica os movimentos
+      // que ele ainda não processou
+      function reconcile(state) {
+        if (!assignedSide || !state.acks || !state.paddles) return;
+        const ack = state.acks[assignedSide] || 0;
+        pendingInputs = pendingInputs.filter((input) => input.seq > ack);
+        predictedPaddle = pendingInputs.reduce(
+          (position, input) => movePaddle(position, input.direction),
+          state.paddles[assignedSide]
+        );
+      }
+
+      // Envia um movimento e já o aplica localmente. Respeita a velocidade
+      // máxima do servidor, para a predição não se adiantar à fila dele.
+      function sendMove(direction) {
+        if (!assignedSide || !socket || socket.readyState !== WebSocket.OPEN) return;
+        const now = performance.now();
+        if (now - lastMoveSent < (PADDLE_STEP / paddleMaxSpeed) * 1000) return;
+        lastMoveSent = now;
+
+        const seq = ++inputSeq;
+        socket.send(JSON.stringify({ type: "player_move", direction, seq }));
+        if (isPaused || predictedPaddle === null) return;
+        pendingInputs.push({ seq, direction });
+        predictedPaddle = movePaddle(predictedPaddle, direction);
+      }
+
+      function showState(state) {
+        reconcile(state);
+        if (gameInstance) {
+          gameInstance.pushSnapshot(state);
+        } else {
+          pendingState = state;
+        }
+      }
+
       // Funções de controle para mobile e desktop
       function handlePressStart(directionKey, event) {
         event.preventDefault();
         if (!assignedSide || !socket || socket.readyState !== WebSocket.OPEN) return;
         if (moveInterval) return;
         moveInterval = setInterval(() => {
-          socket.send(JSON.stringify({
-            type: "player_move",
-            direction: directionKey === "w" ? "up" : "down"
-          }));
+          sendMove(directionKey === "w" ? "up" : "down");
         }, 100);
       }
 
@@ -197,10 +399,7 @@
       function handleKeyDown(e) {
         if (!assignedSide || !socket || socket.readyState !== WebSocket.OPEN) return;
         if (["w", "s"].includes(e.key)) {
-          socket.send(JSON.stringify({
-            type: "player_move",
-            direction: e.key === "w" ? "up" : "down"
-          }));
+          sendMove(e.key === "w" ? "up" : "down");
         }
       }
       window.addEventListener("keydown", handleKeyDown);
@@ -257,9 +456,13 @@
         }
 
         const accessToken = localStorage.getItem("access");
-        const wsUrl = `${getWsUrl(`/ws/game/${matchId}/`)}?access_token=${accessToken}`;
+        // O padrão é JSON. Com localStorage "game_format" = "binary", os estados
+        // chegam como quadros binários (opt-in); o resto segue em JSON.
+        const format = localStorage.getItem("game_format") === "binary" ? "&format=binary" : "";
+        const wsUrl = `${getWsUrl(`/ws/game/${matchId}/`)}?access_token=${accessToken}${format}`;
 
         socket = new WebSocket(wsUrl);
+        socket.binaryType = "arraybuffer";
 
         socket.onopen = () => {
           const canvas = document.getElementById("pongCanvas");
@@ -268,18 +471,27 @@
             gameInstance = gameCore(canvas);
 
             if (pendingState) {
-              gameInstance.renderState(pendingState);
+              gameInstance.pushSnapshot(pendingState);
               pendingState = null;
             }
           }
         };
 
         socket.onmessage = (event) => {
+          if (event.data instanceof ArrayBuffer) {
+            currentState = decodeStateFrame(event.data);
+            showState(currentState);
+            return;
+          }
+
           const data = JSON.parse(event.data);
 
           switch (data.type) {
             case "assigned_side":
               assignedSide = data.side;
+              tickRate = data.tick_rate || tickRate;
+              broadcastRate = data.broadcast_rate || broadcastRate;
+              paddleMaxSpeed = data.paddle_max_speed || paddleMaxSpeed;
               break;
             case "countdown":
               countdown = data.state?.message || null;
@@ -313,16 +525,25 @@
                 elements.pausedOverlay.style.display = "none";
               }
               if (pendingState && gameInstance) {
-                gameInstance.renderState(pendingState);
+                gameInstance.pushSnapshot(pendingState);
                 pendingState = null;
               }
               break;
             case "state_update":
-              if (gameInstance) {
-                gameInstance.renderState(data.state);
-              } else {
-                pendingState = data.state;
+              // Keyframe: estado completo (sem seq quando enviado na conexão)
+              currentState = data.state;
+              lastSeq = typeof data.state.seq === "number" ? data.state.seq : null;
+              resyncRequested = false;
+              showState(currentState);
+              break;
+            case "state_delta":
+              if (!currentState || lastSeq === null || data.state.seq !== lastSeq + 1) {
+                requestResync();
+                break;
               }
+              currentState = applyDelta(currentState, data.state);
+              lastSeq = data.state.seq;
+              showState(currentState);
               break;
             case "walkover":
               alert(data.state.message);
@@ -109,12 +109,14 @@
             wins: document.getElementById('stats-wins'),
             losses: document.getElementById('stats-losses'),
             winrate: document.getElementById('stats-winrate'),
-            matchList: document.getElementById('match-history-list')
+            matchList: document.getElementById('match-history-list'),
+            matchMore: document.getElementById('match-history-more')
         };
 
         let state = {
             user: null,
             matches: [],
+            nextCursor: null,
             error: null
         };
 
@@ -128,6 +130,62 @@
         const pathSegments = window.location.pathname.split('/');
         const user_id = pathSegments[pathSegments.length - 1];
 
+        // O histórico vem paginado por cursor: cada página traz o next_cursor da seguinte
+        const fetchMatchPage = async (cursor) => {
+            const accessToken = localStorage.getItem('access');
+            const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+            const res = await fetch(`${API_BASE_URL}/api/game/match-history/${user_id}/${query}`, {
+                headers: { Authorization: `Bearer ${accessToken}` }
+            });
+            if (!res.ok) throw new Error('Falha ao carregar histórico');
+            return res.json();
+        };
+
+        const renderMatch = (match) => `
+                <li class="list-group-item">
+                  <div class="d-flex justify-content-between align-items-center">
+                    <span>${new Date(match.date).toLocaleDateString()}</span>
+                    <span class="badge ${
+                        match.result === "Derrota" ? 'bg-danger' :
+                        match.result === "Vitória" ? 'bg-success' :
+                        'bg-warning'
+                    }">
+                      ${match.result === "Derrota" || match.result === "Vitória" ? match.result : "Não disputada"}
+                    </span>
+                  </div>
+                  <div class="mt-2">
+                    <strong>Oponente:</strong> ${match.opponent_display_name}${match.opponent_alias ? ' (' + match.opponent_alias + ')' : ''}
+                  </div>
+                  <div>
+                    <strong>Placar:</strong> ${match.score.player1} x ${match.score.player2}
+                  </div>
+                  ${match.tournament_name ? `<div><strong>Torneio:</strong> ${match.tournament_name}</div>` : ''}
+                </li>
+              `;
+
+        const updateMatchMore = () => {
+            if (elements.matchMore) {
+                elements.matchMore.classList.toggle('d-none', !state.nextCursor);
+            }
+        };
+
+        if (elements.matchMore) {
+            elements.matchMore.onclick = async () => {
+                if (!state.nextCursor) return;
+                elements.matchMore.disabled = true;
+                try {
+                    const page = await fetchMatchPage(state.nextCursor);
+                    state = { ...state, matches: [...state.matches, ...page.results], nextCursor: page.next_cursor };
+                    elements.matchList.insertAdjacentHTML('beforeend', page.results.map(renderMatch).join(''));
+                    updateMatchMore();
+                } catch (err) {
+                    console.error('Erro no histórico:', err);
+                } finally {
+                    elements.matchMore.disabled = false;
+                }
+            };
+        }
+
         const loggedUserId = localStorage.getItem('id');
         const isOwnProfile = parseInt(user_id) === parseInt(loggedUserId);
 
@@ -143,15 +201,10 @@
             const userData = await userRes.json();
             currentUser = userData; // Armazena os dados atuais para uso no formulário de edição
 
-            // Buscar histórico de partidas
-            const matchesRes = await fetch(`${API_BASE_URL}/api/game/match-history/${user_id}/`, {
-                headers: { Authorization: `Bearer ${accessToken}` }
-            });
-            if (!matchesRes.ok) throw new Error('Falha ao carregar histórico');
-
-            const matchesData = await matchesRes.json();
+            // Buscar a primeira página do histórico de partidas
+            const matchesData = await fetchMatchPage(null);
 
-            state = { ...state, user: userData, matches: matchesData };
+            state = { ...state, user: userData, matches: matchesData.results, nextCursor: matchesData.next_cursor };
 
             elements.loading.classList.add('d-none');
             elements.content.classList.remove('d-none');
@@ -172,27 +225,8 @@
                 : 0;
             elements.winrate.textContent = `${winRate}%`;
 
-            elements.matchList.innerHTML = state.matches.map(match => `
-                <li class="list-group-item">
-                  <div class="d-flex justify-content-between align-items-center">
-                    <span>${new Date(match.date).toLocaleDateString()}</span>
-                    <span class="badge ${
-                        match.result === "Derrota" ? 'bg-danger' :
-                        match.result === "Vitória" ? 'bg-success' :
-                        'bg-warning'
-                    }">
-                      ${match.result === "Derrota" || match.result === "Vitória" ? match.result : "Não disputada"}
-                    </span>
-                  </div>
-                  <div class="mt-2">
-                    <strong>Oponente:</strong> ${match.opponent_display_name}${match.opponent_alias ? ' (' + match.opponent_alias + ')' : ''}
-                  </div>
-                  <div>
-                    <strong>Placar:</strong> ${match.score.player1} x ${match.score.player2}
-                  </div>
-                  ${match.tournament_name ? `<div><strong>Torneio:</strong> ${match.tournament_name}</div>` : ''}
-                </li>
-              `).join('');
+            elements.matchList.innerHTML = state.matches.map(renderMatch).join('');
+            updateMatchMore();
 
             if (isOwnProfile) {
                 document.getElementById('edit-profile-btn').classList.remove('d-none');
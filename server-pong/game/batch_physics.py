@@ -0,0 +1,179 @@
+import numpy as np
+
+from .match_engine import (
+    BALL_RADIUS, FIELD_HEIGHT, FIELD_WIDTH, LEFT_PADDLE_FACE, MAX_BOUNCES, PADDLE_HEIGHT, RIGHT_PADDLE_FACE,
+)
+
+# Simulação em lote: as partidas de um worker ficam em arrays (structure of
+# arrays) e um único passo vetorizado avança todas elas, com as mesmas regras
+# de `step_ball`. Usada quando GAME_ENGINE["PHYSICS"] == "batch".
+
+
+class BatchSimulation:
+    """
+    Bolas, raquetes e placares de várias partidas em arrays NumPy, um índice por partida.
+    """
+    def __init__(self, capacity=64):
+        self.slots = {}  # match_id -> índice nos arrays
+        self.free = []
+        self.capacity = 0
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.speed_x = np.zeros(0)
+        self.speed_y = np.zeros(0)
+        self.paddle_left = np.zeros(0)
+        self.paddle_right = np.zeros(0)
+        self.score_left = np.zeros(0, dtype=np.int64)
+        self.score_right = np.zeros(0, dtype=np.int64)
+        self.ticks = np.zeros(0, dtype=np.int64)
+        self.active = np.zeros(0, dtype=bool)
+        self._grow(capacity)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, match_id):
+        return match_id in self.slots
+
+    def _grow(self, capacity):
+        extra = capacity - self.capacity
+        for name in ("x", "y", "speed_x", "speed_y", "paddle_left", "paddle_right",
+                     "score_left", "score_right", "ticks", "active"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros(extra, dtype=array.dtype)]))
+        self.free.extend(range(capacity - 1, self.capacity - 1, -1))
+        self.capacity = capacity
+
+    def add(self, match_id, state, tick=0):
+        """
+        Reserva um índice para a partida e copia seu estado. A partida começa inativa.
+        """
+        if match_id not in self.slots:
+            if not self.free:
+                self._grow(self.capacity * 2)
+            self.slots[match_id] = self.free.pop()
+        slot = self.slots[match_id]
+        self.load(match_id, state)
+        self.ticks[slot] = tick
+        self.active[slot] = False
+
+    def remove(self, match_id):
+        slot = self.slots.pop(match_id, None)
+        if slot is not None:
+            self.active[slot] = False
+            self.free.append(slot)
+
+    def set_active(self, match_id, active):
+        slot = self.slots.get(match_id)
+        if slot is not None:
+            self.active[slot] = active
+
+    def tick(self, match_id):
+        return int(self.ticks[self.slots[match_id]])
+
+    def load(self, match_id, state):
+        """
+        Copia bola, raquetes e placar do MatchState para os arrays.
+        """
+        slot = self.slots[match_id]
+        self.x[slot] = state.ball_x
+        self.y[slot] = state.ball_y
+        self.speed_x[slot] = state.ball_speed_x
+        self.speed_y[slot] = state.ball_speed_y
+        self.set_paddles(match_id, state)
+        self.score_left[slot] = state.score_left
+        self.score_right[slot] = state.score_right
+
+    def set_paddles(self, match_id, state):
+        slot = self.slots[match_id]
+        self.paddle_left[slot] = state.paddle_left
+        self.paddle_right[slot] = state.paddle_right
+
+    def store(self, match_id, state):
+        """
+        Copia bola, raquetes e placar dos arrays de volta para o MatchState.
+        Retorna o tick da partida.
+        """
+        slot = self.slots.get(match_id)
+        if slot is None:
+            return None
+        state.ball_x = self.x[slot].item()
+        state.ball_y = self.y[slot].item()
+        state.ball_speed_x = self.speed_x[slot].item()
+        state.ball_speed_y = self.speed_y[slot].item()
+        state.paddle_left = self.paddle_left[slot].item()
+        state.paddle_right = self.paddle_right[slot].item()
+        state.score_left = int(self.score_left[slot])
+        state.score_right = int(self.score_right[slot])
+        return int(self.ticks[slot])
+
+    def finished(self, winning_score):
+        """
+        Partidas ativas que atingiram a pontuação de vitória.
+        """
+        done = self.active & ((self.score_left >= winning_score) | (self.score_right >= winning_score))
+        if not done.any():
+            return []
+        slots = set(np.flatnonzero(done).tolist())
+        return [match_id for match_id, slot in self.slots.items() if slot in slots]
+
+    def step(self, dt):
+        """
+        Avança um passo de todas as partidas ativas (mesmas regras de `step_ball`,
+        inclusive a detecção contínua de colisão, resolvida para todas de uma vez).
+        """
+        active = self.active
+        x, y = self.x, self.y
+        speed_x, speed_y = self.speed_x, self.speed_y
+        paddle_left, paddle_right = self.paddle_left, self.paddle_right
+        self.ticks += active
+
+        remaining = np.where(active, dt, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for _ in range(MAX_BOUNCES):
+                moving = remaining > 0
+                if not moving.any():
+                    break
+
+                wall_time = np.where(
+                    speed_y < 0, np.maximum(0.0, y / -speed_y),
+                    np.where(speed_y > 0, np.maximum(0.0, (FIELD_HEIGHT - y) / speed_y), np.inf),
+                )
+                left_time = np.where(speed_x < 0, np.maximum(0.0, (x - LEFT_PADDLE_FACE) / -speed_x), np.inf)
+                left_y = y + speed_y * np.where(np.isfinite(left_time), left_time, 0.0)
+                left_time = np.where((paddle_left <= left_y) & (left_y <= paddle_left + PADDLE_HEIGHT), left_time, np.inf)
+                right_time = np.where(speed_x > 0, np.maximum(0.0, (RIGHT_PADDLE_FACE - x) / speed_x), np.inf)
+                right_y = y + speed_y * np.where(np.isfinite(right_time), right_time, 0.0)
+                right_time = np.where((paddle_right <= right_y) & (right_y <= paddle_right + PADDLE_HEIGHT), right_time, np.inf)
+
+                # Primeiro choque dentro do tempo restante; empates ficam com a parede
+                hit_time = np.minimum(wall_time, np.minimum(left_time, right_time))
+                hit = moving & (hit_time <= remaining)
+                travel = np.where(hit, hit_time, remaining)
+                x += speed_x * travel
+                y += speed_y * travel
+                remaining = np.where(hit, remaining - travel, 0.0)
+
+                wall = hit & (wall_time == hit_time)
+                left = hit & ~wall & (left_time == hit_time)
+                right = hit & ~wall & ~left
+
+                speed_y[wall] = -speed_y[wall]
+                speed_x[left] = -speed_x[left]
+                speed_y[left] = (y[left] - (paddle_left[left] + PADDLE_HEIGHT / 2)) * 4
+                speed_x[right] = -speed_x[right]
+                speed_y[right] = (y[right] - (paddle_right[right] + PADDLE_HEIGHT / 2)) * 4
+
+        # Ponto para a direita quando a bola passa pela esquerda, e vice-versa
+        right_scores = active & (x - BALL_RADIUS < 0)
+        left_scores = active & ~right_scores & (x + BALL_RADIUS > FIELD_WIDTH)
+        self.score_right += right_scores
+        self.score_left += left_scores
+
+        scored = right_scores | left_scores
+        x[scored] = 400
+        y[scored] = 300
+        speed_x[right_scores] = 300
+        speed_y[right_scores] = 100
+        speed_x[left_scores] = -300
+        speed_y[left_scores] = -100
@@ -15,7 +15,7 @@ class GameConsumer(AsyncWebsocketConsumer):
         # send initial game state on connection
         await self.channel_layer.group_send(
             self.group_name,
-            {"type": "game.state", "message": game_manager.state}
+            {"type": "game.state", "message": game_manager.state.to_wire()}
         )
         await self.accept()
 
@@ -2,22 +2,21 @@ import asyncio
 
 from channels.layers import get_channel_layer
 
+from .match_state import MatchState
+
 
 class GameManager:
     def __init__(self):
         self.running = False
-        self.state = {
-            "player1": {
-                "position": 0, # y-coordinate
-            },
-            "player2": {
-                "position": 0,
-            },
-            "ball": {
-                "position": {"x": 0, "y": 0},
-                "velocity": {"x": 5, "y": 3},
-            },
-        }
+        # Mesmo MatchState do engine das partidas; aqui a velocidade é em pixels por quadro
+        self.state = MatchState(
+            paddle_left=0,
+            paddle_right=0,
+            ball_x=0,
+            ball_y=0,
+            ball_speed_x=5,
+            ball_speed_y=3,
+        )
         self.channel_layer = get_channel_layer()
         self.loop_task = None
 
@@ -38,25 +37,21 @@ class GameManager:
 
             await self.channel_layer.group_send(
                 group_name,
-                {"type": "game.state", "message": self.state}
+                {"type": "game.state", "message": self.state.to_wire()}
             )
             await asyncio.sleep(1/30)
 
     async def move_ball(self):
-        ball = self.state["ball"]
-        new_position = {
-            "x": ball["position"]["x"] + ball["velocity"]["x"],
-            "y": ball["position"]["y"] + ball["velocity"]["y"]
-        }
-        ball["position"] = new_position
+        state = self.state
+        state.ball_x += state.ball_speed_x
+        state.ball_y += state.ball_speed_y
 
         # horizontal collision
-        if (ball["position"]["x"] >= 800
-            or ball["position"]["x"] <= 0):
-            ball["velocity"]["x"] = -ball["velocity"]["x"]
+        if (state.ball_x >= 800
+            or state.ball_x <= 0):
+            state.ball_speed_x = -state.ball_speed_x
 
         # vertical collision
-        if (ball["position"]["y"] >= 590
-            or ball["position"]["y"] <= 0):
-            ball["velocity"]["y"] = -ball["velocity"]["y"]
-
+        if (state.ball_y >= 590
+            or state.ball_y <= 0):
+            state.ball_speed_y = -state.ball_speed_y
@@ -0,0 +1,186 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from setup.redis_pool import get_redis
+
+# Rankings pré-calculados em sorted sets do Redis:
+#
+#   <prefixo>:leaderboard:wins          user_id -> vitórias (todos os usuários)
+#   <prefixo>:leaderboard:tournaments   user_id -> torneios vencidos (só quem venceu algum)
+#   <prefixo>:leaderboard:built         marcador: os rankings já foram montados a partir do banco
+#
+# Partidas e torneios concluídos incrementam os rankings, e usuários excluídos
+# saem deles (game/signals.py); o comando `rebuild_leaderboard` (ou a primeira
+# leitura sem o marcador) recria tudo a partir do banco. Top-K, posição e vizinhos de um usuário custam O(log N).
+#
+# A posição é a de competição: 1 + quantos usuários têm pontuação maior,
+# então empatados dividem a mesma posição.
+
+WINS = "wins"
+TOURNAMENTS = "tournaments"
+BOARDS = (WINS, TOURNAMENTS)
+
+MAX_LIMIT = 100  # maior top-K aceito pelas APIs
+MAX_WINDOW = 10  # vizinhos de cada lado aceitos pelas APIs
+REBUILD_CHUNK = 5000  # linhas lidas do banco e gravadas no Redis por vez
+
+
+def leaderboard_key(board):
+    return f"{settings.GAME_ENGINE['KEY_PREFIX']}:leaderboard:{board}"
+
+
+def built_key():
+    return f"{settings.GAME_ENGINE['KEY_PREFIX']}:leaderboard:built"
+
+
+async def record_win(user_id):
+    await get_redis().zincrby(leaderboard_key(WINS), 1, str(user_id))
+
+
+async def record_tournament_win(user_id, previous_winner_id=None):
+    """
+    +1 torneio para o vencedor; se o vencedor foi trocado, -1 para o anterior.
+    """
+    key = leaderboard_key(TOURNAMENTS)
+    async with get_redis().pipeline(transaction=True) as pipe:
+        if previous_winner_id is not None:
+            pipe.zincrby(key, -1, str(previous_winner_id))
+            pipe.zremrangebyscore(key, "-inf", 0)
+        if user_id is not None:
+            pipe.zincrby(key, 1, str(user_id))
+        await pipe.execute()
+
+
+async def remove_user(user_id):
+    """
+    Tira o usuário de todos os rankings (usuário excluído).
+    """
+    async with get_redis().pipeline(transaction=True) as pipe:
+        for board in BOARDS:
+            pipe.zrem(leaderboard_key(board), str(user_id))
+        await pipe.execute()
+
+
+async def record_match(match):
+    """
+    Atualiza os rankings com uma partida concluída por `complete_match`.
+    Falhas no Redis não desfazem a partida: o próximo rebuild corrige.
+    """
+    try:
+        await record_win(match.winner_id)
+        # Só muda o ranking de torneios se o vencedor mudou (ele pode já ter
+        # sido creditado pela API ou pelo tournament_manager)
+        winner_id = getattr(match, "tournament_winner_id", None)
+        previous_winner_id = getattr(match, "previous_tournament_winner_id", None)
+        if winner_id != previous_winner_id:
+            await record_tournament_win(winner_id, previous_winner_id)
+    except Exception as e:
+        print(f"Erro ao atualizar o ranking com a partida {match.id}: {e}")
+
+
+def _rows_after(board, last_id):
+    """
+    Próximo lote (id, pontuação) do banco, em ordem de id, a partir de `last_id`.
+    """
+    from django.contrib.auth import get_user_model
+    from django.db.models import Count
+    from .models import Tournament
+
+    if board == WINS:
+        rows = get_user_model().objects.filter(id__gt=last_id).order_by("id").values_list("id", "wins")
+    else:
+        rows = (
+            Tournament.objects.filter(winner_id__gt=last_id)
+            .values("winner_id")
+            .annotate(won=Count("id"))
+            .order_by("winner_id")
+            .values_list("winner_id", "won")
+        )
+    return list(rows[:REBUILD_CHUNK])
+
+
+async def rebuild(boards=BOARDS):
+    """
+    Recria os rankings a partir do banco, em lotes, numa chave temporária que
+    substitui a atual de uma vez (RENAME). Retorna {ranking: membros}.
+    """
+    redis_client = get_redis()
+    counts = {}
+    for board in boards:
+        key = leaderboard_key(board)
+        temp_key = f"{key}:rebuild"
+        await redis_client.delete(temp_key)
+        last_id = 0
+        counts[board] = 0
+        while True:
+            rows = await sync_to_async(_rows_after)(board, last_id)
+            if not rows:
+                break
+            await redis_client.zadd(temp_key, {str(user_id): score for user_id, score in rows})
+            counts[board] += len(rows)
+            last_id = rows[-1][0]
+        if counts[board]:
+            await redis_client.rename(temp_key, key)
+        else:
+            await redis_client.delete(key)
+    await redis_client.set(built_key(), 1)
+    return counts
+
+
+async def ensure_built():
+    if not await get_redis().exists(built_key()):
+        await rebuild()
+
+
+async def _positions(key, scores):
+    """
+    Posição de competição de cada pontuação distinta: {pontuação: posição}.
+    """
+    distinct = sorted(set(scores), reverse=True)
+    async with get_redis().pipeline(transaction=False) as pipe:
+        for score in distinct:
+            pipe.zcount(key, f"({score}", "+inf")
+        greater = await pipe.execute()
+    return {score: count + 1 for score, count in zip(distinct, greater)}
+
+
+async def _entries(key, members):
+    positions = await _positions(key, [score for _, score in members])
+    return [
+        {"user_id": int(user_id), "score": int(score), "position": positions[score]}
+        for user_id, score in members
+    ]
+
+
+async def top(board, limit=10):
+    """
+    Os `limit` primeiros do ranking: [{"user_id", "score", "position"}].
+    """
+    await ensure_built()
+    key = leaderboard_key(board)
+    members = await get_redis().zrevrange(key, 0, max(1, min(limit, MAX_LIMIT)) - 1, withscores=True)
+    return await _entries(key, members)
+
+
+async def rank(board, user_id, window=0, score=None):
+    """
+    Posição do usuário e até `window` vizinhos de cada lado. Quem não está no
+    ranking (ex.: nenhum torneio vencido) recebe a posição da `score` informada,
+    sem vizinhos; sem `score`, retorna None.
+    """
+    await ensure_built()
+    redis_client = get_redis()
+    key = leaderboard_key(board)
+    member_score = await redis_client.zscore(key, str(user_id))
+    if member_score is None:
+        if score is None:
+            return None
+        positions = await _positions(key, [score])
+        return {"user_id": int(user_id), "score": int(score), "position": positions[score], "neighbors": []}
+
+    window = max(0, min(window, MAX_WINDOW))
+    index = await redis_client.zrevrank(key, str(user_id))
+    members = await redis_client.zrevrange(key, max(0, index - window), index + window, withscores=True)
+    entries = await _entries(key, members)
+    me = next(entry for entry in entries if entry["user_id"] == int(user_id))
+    return dict(me, neighbors=entries)
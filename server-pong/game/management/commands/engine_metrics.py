@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand
+
+from game.match_store import load_metrics
+from game.metrics import histogram_quantile, render_prometheus
+
+
+def _ms(value):
+    if value is None:
+        return "-"
+    return f"{value * 1000:.2f}ms" if value != float("inf") else "inf"
+
+
+class Command(BaseCommand):
+    help = "Mostra o snapshot de métricas publicado no Redis por cada engine (worker) vivo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prometheus", action="store_true", help="Imprime no formato texto do Prometheus.")
+        parser.add_argument("--json", action="store_true", help="Imprime os snapshots em JSON.")
+
+    def handle(self, *args, **options):
+        snapshots = asyncio.run(load_metrics())
+        if options["prometheus"]:
+            self.stdout.write(render_prometheus(snapshots), ending="")
+            return
+        if options["json"]:
+            self.stdout.write(json.dumps(snapshots, indent=2))
+            return
+        if not snapshots:
+            self.stdout.write("Nenhum engine publicou métricas.")
+            return
+
+        for worker, snapshot in sorted(snapshots.items()):
+            metrics = snapshot["metrics"]
+            self.stdout.write(self.style.SUCCESS(
+                f"{worker}: {snapshot['matches']} partidas, {metrics['spectators']} espectadores"
+            ))
+            tick = metrics["tick_seconds"]
+            overshoot = metrics["sleep_overshoot_seconds"]
+            self.stdout.write(
+                f"  tick p50={_ms(histogram_quantile(tick, 0.5))} p99={_ms(histogram_quantile(tick, 0.99))}"
+                f"  despertar p99={_ms(histogram_quantile(overshoot, 0.99))}"
+                f"  atrasados={metrics['late_frames']} passos descartados={metrics['dropped_steps']}"
+            )
+            for target, histogram in sorted(metrics["send_seconds"].items()):
+                self.stdout.write(f"  envio {target}: p99={_ms(histogram_quantile(histogram, 0.99))} (n={histogram['count']})")
+            for operation, histogram in sorted(metrics["redis_seconds"].items()):
+                self.stdout.write(f"  redis {operation}: p99={_ms(histogram_quantile(histogram, 0.99))} (n={histogram['count']})")
+            payload = metrics["payload_bytes"]
+            if payload["count"]:
+                self.stdout.write(f"  mensagens: {payload['count']}, {payload['sum'] / payload['count']:.0f} bytes em média")
+            if metrics["errors"]:
+                self.stdout.write(self.style.WARNING(f"  erros: {metrics['errors']}"))
@@ -0,0 +1,20 @@
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+
+from game import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Recria os rankings do Redis (vitórias e torneios vencidos) a partir do banco."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--board", choices=leaderboard.BOARDS, action="append",
+            help="Ranking a recriar (pode repetir). Padrão: todos.",
+        )
+
+    def handle(self, *args, **options):
+        boards = tuple(options["board"] or leaderboard.BOARDS)
+        counts = async_to_sync(leaderboard.rebuild)(boards)
+        for board, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f"Ranking {board}: {count} usuários."))
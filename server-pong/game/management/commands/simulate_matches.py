@@ -0,0 +1,332 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import deque
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+SIM_EMAIL_DOMAIN = "loadtest.local"
+
+
+def percentiles(values):
+    """
+    p50/p90/p99/máximo em milissegundos.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))] * 1000
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": values[-1] * 1000, "count": len(values)}
+
+
+class SyntheticPlayer:
+    """
+    Jogador sintético: conecta no GameConsumer pela aplicação ASGI completa
+    (com o middleware JWT), move a raquete na taxa pedida e mede o intervalo
+    entre quadros e a latência entre o envio de um movimento e sua chegada.
+    """
+    def __init__(self, application, match_id, token, move_rate, binary):
+        from channels.testing import WebsocketCommunicator
+
+        query = f"access_token={token}" + ("&format=binary" if binary else "")
+        self.communicator = WebsocketCommunicator(application, f"/ws/game/{match_id}/?{query}")
+        self.move_rate = move_rate
+        self.side = None
+        self.started = asyncio.Event()
+        self.finished = False
+        self.position = None  # última posição da raquete vista nos quadros
+        self.predicted = None  # posição esperada depois dos movimentos enviados
+        self.direction = random.choice(("up", "down"))
+        self.pending = deque()  # (instante de envio, passo) dos movimentos ainda não vistos
+        self.seq = 0
+        self.last_frame = None
+        self.frame_intervals = []
+        self.input_latencies = []
+        self.messages = 0
+        self.bytes = 0
+
+    async def connect(self):
+        connected, _ = await self.communicator.connect(timeout=10)
+        return connected
+
+    async def read(self):
+        from game.wire import STATE_FRAME, FRAME_STATE, QUANT_MAX
+        from game.match_engine import FIELD_HEIGHT
+
+        while not self.finished:
+            try:
+                message = await self.communicator.receive_output(timeout=30)
+            except asyncio.TimeoutError:
+                break
+            if message["type"] == "websocket.close":
+                break
+            now = time.monotonic()
+            self.messages += 1
+
+            paddles = None
+            ticked = False
+            if message.get("bytes") is not None:
+                self.bytes += len(message["bytes"])
+                kind, _, _, _, _, left, right, *_ = STATE_FRAME.unpack(message["bytes"])
+                paddles = {"left": left / QUANT_MAX * FIELD_HEIGHT, "right": right / QUANT_MAX * FIELD_HEIGHT}
+                ticked = kind != FRAME_STATE
+            else:
+                self.bytes += len(message["text"])
+                data = json.loads(message["text"])
+                state = data.get("state") or {}
+                if data["type"] == "assigned_side":
+                    self.side = data.get("side")
+                elif data["type"] == "game_start":
+                    self.started.set()
+                elif data["type"] in ("walkover", "match_finished"):
+                    self.finished = True
+                elif data["type"] in ("state_update", "state_delta"):
+                    paddles = state.get("paddles")
+                    ticked = "tick" in state
+
+            if ticked:
+                if self.last_frame is not None:
+                    self.frame_intervals.append(now - self.last_frame)
+                self.last_frame = now
+            if paddles and self.side in paddles:
+                self.observe(paddles[self.side], now)
+
+    def observe(self, position, now):
+        if self.position is None:
+            self.position = self.predicted = position
+            return
+        if abs(position - self.position) < 1:
+            return
+        # Descobre quantos dos movimentos pendentes (os mais antigos) o quadro já mostra
+        expected = self.position
+        for count, (_, step) in enumerate(self.pending, start=1):
+            expected += step
+            if abs(expected - position) < 1:
+                for _ in range(count):
+                    sent_at, _ = self.pending.popleft()
+                    self.input_latencies.append(now - sent_at)
+                break
+        self.position = position
+
+    async def move(self, until):
+        from game.match_engine import FIELD_HEIGHT, PADDLE_HEIGHT, PADDLE_STEP
+
+        await self.started.wait()
+        while not self.finished and time.monotonic() < until:
+            if self.predicted is not None:
+                step = -PADDLE_STEP if self.direction == "up" else PADDLE_STEP
+                # Inverte antes de bater na borda, para todo movimento mudar a raquete
+                if not 0 <= self.predicted + step <= FIELD_HEIGHT - PADDLE_HEIGHT:
+                    self.direction = "down" if self.direction == "up" else "up"
+                    step = -step
+                self.predicted += step
+                self.seq += 1
+                self.pending.append((time.monotonic(), step))
+                await self.communicator.send_to(text_data=json.dumps({
+                    "type": "player_move",
+                    "direction": self.direction,
+                    "seq": self.seq,
+                }))
+            # Intervalos exponenciais: chegadas de um jogador humano, não um metrônomo
+            await asyncio.sleep(random.expovariate(self.move_rate))
+
+    async def disconnect(self):
+        self.finished = True
+        try:
+            await self.communicator.disconnect(timeout=5)
+        except Exception:
+            pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula N partidas com jogadores sintéticos contra ws/game/<match_id>/ neste processo "
+        "e mede jitter de tick, latência de envio, CPU e operações no Redis por partida."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--matches", type=int, default=10, help="Partidas simultâneas.")
+        parser.add_argument("--duration", type=float, default=30, help="Segundos de jogo após a contagem regressiva.")
+        parser.add_argument("--move-rate", type=float, default=10, help="Movimentos por segundo de cada jogador.")
+        parser.add_argument("--binary", action="store_true", help="Usa quadros binários (?format=binary).")
+        parser.add_argument("--in-memory", action="store_true", help="Usa o InMemoryChannelLayer em vez do channels_redis.")
+        parser.add_argument("--fake-redis", action="store_true", help="Usa um Redis em memória (requer fakeredis).")
+        parser.add_argument("--keep", action="store_true", help="Mantém os usuários e partidas sintéticos no banco.")
+        parser.add_argument("--json", help="Grava o relatório neste arquivo.")
+
+    def handle(self, *args, **options):
+        if options["in_memory"]:
+            settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+        pairs = self.create_matches(options["matches"])
+        report = asyncio.run(self.run(pairs, options))
+
+        self.print_report(report)
+        if options["json"]:
+            with open(options["json"], "w") as report_file:
+                json.dump(report, report_file, indent=2)
+            self.stdout.write(f"Relatório gravado em {options['json']}.")
+
+    def create_matches(self, count):
+        """
+        Cria os usuários e as partidas sintéticas e gera um token JWT por jogador.
+        """
+        from rest_framework_simplejwt.tokens import AccessToken
+        from game.models import Match
+
+        User = get_user_model()
+        pairs = []
+        for index in range(count):
+            players = []
+            for slot in (1, 2):
+                user, _ = User.objects.get_or_create(
+                    email=f"sim{index}-{slot}@{SIM_EMAIL_DOMAIN}",
+                    defaults={"display_name": f"sim{index}-{slot}"},
+                )
+                players.append(user)
+            match = Match.objects.create(player1=players[0], player2=players[1], status="ongoing")
+            pairs.append((match.id, [str(AccessToken.for_user(user)) for user in players]))
+        return pairs
+
+    async def run(self, pairs, options):
+        if options["fake_redis"]:
+            try:
+                import fakeredis
+            except ImportError:
+                raise CommandError("--fake-redis requer o pacote fakeredis.")
+            from setup.redis_pool import InstrumentedConnectionPool, install_pool
+            install_pool(InstrumentedConnectionPool(
+                connection_class=fakeredis.aioredis.FakeConnection,
+                server=fakeredis.FakeServer(),
+                decode_responses=True,
+                max_connections=settings.REDIS_POOL["MAX_CONNECTIONS"],
+                timeout=settings.REDIS_POOL["TIMEOUT"],
+            ))
+        try:
+            return await self.simulate(pairs, options)
+        finally:
+            if not options["keep"]:
+                await self.cleanup()
+
+    async def cleanup(self):
+        """
+        Remove os usuários sintéticos (e, em cascata, as partidas). A exclusão roda
+        neste event loop para que o post_delete (game/signals.py) tire cada um dos
+        rankings no mesmo Redis em que as partidas finalizadas por WO os colocaram.
+        """
+        from asgiref.sync import sync_to_async
+
+        def delete_users():
+            get_user_model().objects.filter(email__endswith=f"@{SIM_EMAIL_DOMAIN}").delete()
+
+        await sync_to_async(delete_users)()
+
+    async def simulate(self, pairs, options):
+        from setup.asgi import application
+        from setup.redis_pool import get_pool_stats, get_redis, pool_metrics
+        from game.match_engine import match_engine
+
+        players = []
+        for match_id, tokens in pairs:
+            # O lado "left" (primeiro a entrar) é o host que coloca a partida no engine
+            for token in tokens:
+                player = SyntheticPlayer(application, match_id, token, options["move_rate"], options["binary"])
+                if not await player.connect():
+                    raise CommandError(f"Conexão recusada na partida {match_id}.")
+                players.append(player)
+        self.stdout.write(f"{len(players)} jogadores conectados em {len(pairs)} partidas.")
+
+        readers = [asyncio.create_task(player.read()) for player in players]
+        await asyncio.wait_for(asyncio.gather(*(player.started.wait() for player in players)), timeout=30)
+
+        redis_ops = await self.redis_commands(get_redis())
+        acquisitions = pool_metrics.acquisitions
+        cpu_started = time.process_time()
+        started = time.monotonic()
+        until = started + options["duration"]
+        await asyncio.gather(*(player.move(until) for player in players))
+        await asyncio.sleep(max(0.0, until - time.monotonic()) + 0.5)
+        elapsed = time.monotonic() - started
+        cpu = time.process_time() - cpu_started
+        acquisitions = pool_metrics.acquisitions - acquisitions
+        redis_total = await self.redis_commands(get_redis())
+        engine = match_engine.get_stats()
+
+        for player in players:
+            await player.disconnect()
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+
+        intervals = [value for player in players for value in player.frame_intervals]
+        ticks = list(engine["matches"].values())
+        matches = len(pairs)
+        return {
+            "matches": matches,
+            "duration_seconds": elapsed,
+            "move_rate": options["move_rate"],
+            "binary": options["binary"],
+            "channel_layer": settings.CHANNEL_LAYERS["default"]["BACKEND"],
+            "physics": engine["physics"],
+            "frame_interval_ms": percentiles(intervals),
+            "frame_jitter_ms": statistics.pstdev(intervals) * 1000 if intervals else None,
+            "input_latency_ms": percentiles([value for player in players for value in player.input_latencies]),
+            "tick": {
+                "max_lag_ms": max((stats["max_lag_seconds"] for stats in ticks), default=0.0) * 1000,
+                "overruns": sum(stats["overruns"] for stats in ticks),
+                "catchup_frames": sum(stats["catchup_frames"] for stats in ticks),
+            },
+            "messages_per_second": sum(player.messages for player in players) / elapsed,
+            "bytes_per_message": (
+                sum(player.bytes for player in players) / max(1, sum(player.messages for player in players))
+            ),
+            "cpu_percent": cpu / elapsed * 100,
+            "cpu_ms_per_match_second": cpu * 1000 / elapsed / matches,
+            "redis_calls_per_match_second": acquisitions / elapsed / matches,
+            "redis_commands_per_match_second": (
+                (redis_total - redis_ops) / elapsed / matches if redis_ops is not None and redis_total is not None else None
+            ),
+            "redis_pool": get_pool_stats(),
+        }
+
+    async def redis_commands(self, redis_client):
+        """
+        Total de comandos processados pelo servidor Redis (None se o INFO não estiver disponível).
+        """
+        try:
+            info = await redis_client.info("stats")
+            return int(info["total_commands_processed"])
+        except Exception:
+            return None
+
+    def print_report(self, report):
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['matches']} partidas por {report['duration_seconds']:.1f}s "
+            f"({report['physics']}, {report['channel_layer'].rsplit('.', 1)[-1]})"
+        ))
+        for name in ("frame_interval_ms", "input_latency_ms"):
+            values = report[name]
+            if values:
+                self.stdout.write(
+                    f"  {name}: p50={values['p50']:.1f} p90={values['p90']:.1f} "
+                    f"p99={values['p99']:.1f} max={values['max']:.1f} (n={values['count']})"
+                )
+        if report["frame_jitter_ms"] is not None:
+            self.stdout.write(f"  frame_jitter_ms: {report['frame_jitter_ms']:.2f}")
+        tick = report["tick"]
+        self.stdout.write(
+            f"  tick: max_lag={tick['max_lag_ms']:.1f}ms overruns={tick['overruns']} catchup={tick['catchup_frames']}"
+        )
+        self.stdout.write(
+            f"  cpu: {report['cpu_percent']:.1f}% ({report['cpu_ms_per_match_second']:.2f} ms por partida-segundo)"
+        )
+        self.stdout.write(f"  redis: {report['redis_calls_per_match_second']:.1f} chamadas por partida-segundo")
+        if report["redis_commands_per_match_second"] is not None:
+            self.stdout.write(f"  redis: {report['redis_commands_per_match_second']:.1f} comandos por partida-segundo no servidor")
+        self.stdout.write(
+            f"  envio: {report['messages_per_second']:.0f} mensagens/s, {report['bytes_per_message']:.0f} bytes por mensagem"
+        )
@@ -0,0 +1,990 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from setup.redis_pool import get_redis, pool_metrics
+from .match_finalizer import finalize_match_by_points, finalize_match_by_wo, send_to_group
+from .match_store import (
+    delete_match, forget_match, get_channels, heartbeat_engine, load_state, owner_key, recent_matches,
+    save_fields, save_metrics, stale_matches,
+)
+from .metrics import game_metrics
+from .replay import ReplayRecorder, replay_writer
+from .shard_ring import HashRing
+
+# Dimensões da mesa (as mesmas usadas pelo cliente em game.js)
+FIELD_WIDTH = 800
+FIELD_HEIGHT = 600
+PADDLE_HEIGHT = 100
+PADDLE_STEP = 10
+PADDLE_MARGIN = 20  # distância da face da raquete até a borda da mesa
+BALL_RADIUS = 10
+# Coordenada x do centro da bola no instante em que toca cada raquete
+LEFT_PADDLE_FACE = PADDLE_MARGIN + BALL_RADIUS
+RIGHT_PADDLE_FACE = FIELD_WIDTH - PADDLE_MARGIN - BALL_RADIUS
+MAX_BOUNCES = 4  # choques resolvidos por passo
+WINNING_SCORE = 5
+INPUT_QUEUE_SIZE = 64  # entradas pendentes por jogador; as mais antigas são descartadas
+INPUT_BURST = 3  # passos de raquete acumuláveis por um jogador parado (ver GAME_ENGINE["PADDLE_MAX_SPEED"])
+
+# Campos do estado que pertencem ao engine enquanto a partida está viva.
+# Os demais (players, initial_players, tournament_id) continuam sendo
+# gravados pelos consumers no Redis. São grupos de `MatchState.to_redis`.
+ENGINE_FIELDS = ("paddles", "ball", "scores", "status", "wo_pending", "wo_initiated_at")
+
+# Campos que mudam a cada passo e seguem por delta; mudanças em qualquer
+# outro campo do estado forçam um keyframe. "acks" traz, por lado, a última
+# sequência de entrada já aplicada (reconciliação da predição do cliente).
+DELTA_FIELDS = ("ball", "paddles", "scores", "acks")
+
+# Renova/libera o lease somente se ele ainda pertencer a este worker
+RENEW_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def match_group_name(match_id):
+    return f"match_{match_id}"
+
+
+def spectator_group_name(match_id):
+    return f"match_{match_id}_spectators"
+
+
+def step_ball(state, dt):
+    """
+    Avança a bola um passo de simulação com detecção contínua de colisão:
+    em vez de testar só a posição final, calcula quando a trajetória do passo
+    cruza as paredes ou a face de uma raquete, resolve o choque nesse instante
+    e segue com o tempo restante. Assim a bola não atravessa a raquete em
+    velocidades altas ou com ticks mais espaçados.
+    """
+    remaining = dt
+    for _ in range(MAX_BOUNCES):
+        x, y = state.ball_x, state.ball_y
+        speed_x, speed_y = state.ball_speed_x, state.ball_speed_y
+
+        # Primeiro choque dentro do tempo restante; empates ficam com a parede
+        hit_time, surface = remaining, None
+        if speed_y < 0:
+            hit_time, surface = _earliest(hit_time, surface, max(0.0, y / -speed_y), "wall")
+        elif speed_y > 0:
+            hit_time, surface = _earliest(hit_time, surface, max(0.0, (FIELD_HEIGHT - y) / speed_y), "wall")
+        if speed_x < 0:
+            t = max(0.0, (x - LEFT_PADDLE_FACE) / -speed_x)
+            if state.paddle_left <= y + speed_y * t <= state.paddle_left + PADDLE_HEIGHT:
+                hit_time, surface = _earliest(hit_time, surface, t, "left")
+        elif speed_x > 0:
+            t = max(0.0, (RIGHT_PADDLE_FACE - x) / speed_x)
+            if state.paddle_right <= y + speed_y * t <= state.paddle_right + PADDLE_HEIGHT:
+                hit_time, surface = _earliest(hit_time, surface, t, "right")
+
+        state.ball_x = x + speed_x * hit_time
+        state.ball_y = y + speed_y * hit_time
+        remaining -= hit_time
+
+        if surface is None:
+            break
+        if surface == "wall":
+            state.ball_speed_y = -speed_y
+        else:
+            paddle = state.paddle_left if surface == "left" else state.paddle_right
+            state.ball_speed_x = -speed_x
+            delta_y = state.ball_y - (paddle + PADDLE_HEIGHT / 2)
+            state.ball_speed_y = delta_y * 4
+
+    if state.ball_x - BALL_RADIUS < 0:
+        state.score_right += 1
+        state.ball_x, state.ball_y, state.ball_speed_x, state.ball_speed_y = 400, 300, 300, 100
+    elif state.ball_x + BALL_RADIUS > FIELD_WIDTH:
+        state.score_left += 1
+        state.ball_x, state.ball_y, state.ball_speed_x, state.ball_speed_y = 400, 300, -300, -100
+
+
+def _earliest(hit_time, surface, t, candidate):
+    if t < hit_time or (t == hit_time and surface is None):
+        return t, candidate
+    return hit_time, surface
+
+
+def apply_input(state, side, direction):
+    """
+    Move a raquete de um lado um passo fixo, limitada à mesa.
+    """
+    if direction == "up":
+        state.set_paddle(side, max(0, state.paddle(side) - PADDLE_STEP))
+    elif direction == "down":
+        state.set_paddle(side, min(FIELD_HEIGHT - PADDLE_HEIGHT, state.paddle(side) + PADDLE_STEP))
+
+
+def broadcast_payload(state, tick, acks=None):
+    """
+    Estado a ser enviado, isolado das mutações feitas pelos próximos passos.
+    """
+    payload = dict(state.to_wire(), tick=tick)
+    if acks is not None:
+        payload["acks"] = dict(acks)
+    return payload
+
+
+def build_delta(previous, current):
+    """
+    Retorna apenas o que mudou nos campos de DELTA_FIELDS entre dois envios,
+    ou None quando algum outro campo mudou e é preciso mandar um keyframe.
+    """
+    if previous.keys() != current.keys():
+        return None
+    for key, value in current.items():
+        if key not in DELTA_FIELDS and key != "tick" and previous[key] != value:
+            return None
+
+    delta = {"tick": current["tick"]}
+    for field in DELTA_FIELDS:
+        if field not in current:
+            continue
+        changes = {
+            name: value
+            for name, value in current[field].items()
+            if previous[field].get(name) != value
+        }
+        if changes:
+            delta[field] = changes
+    return delta
+
+
+async def sleep_until(wake_at):
+    """
+    Dorme até `wake_at` (time.monotonic) e registra quanto o despertar atrasou.
+    """
+    delay = wake_at - time.monotonic()
+    if delay <= 0:
+        await asyncio.sleep(0)
+        return
+    await asyncio.sleep(delay)
+    game_metrics.sleep_overshoot.observe(max(0.0, time.monotonic() - wake_at))
+
+
+class TickStats:
+    """
+    Contadores do agendador de passo fixo de uma partida.
+    """
+    def __init__(self):
+        self.frames = 0
+        self.steps = 0
+        self.catchup_frames = 0  # quadros que precisaram de mais de um passo
+        self.overruns = 0  # quadros que bateram no limite de passos e descartaram tempo
+        self.max_lag = 0.0  # maior atraso (s) acumulado ao fim de um quadro
+
+    def record_frame(self, steps, lag, dt):
+        self.frames += 1
+        self.steps += steps
+        if steps > 1:
+            self.catchup_frames += 1
+        if lag >= dt:
+            self.overruns += 1
+        self.max_lag = max(self.max_lag, lag)
+
+    def snapshot(self):
+        return {
+            "frames": self.frames,
+            "steps": self.steps,
+            "catchup_frames": self.catchup_frames,
+            "overruns": self.overruns,
+            "max_lag_seconds": self.max_lag,
+        }
+
+
+class LiveMatch:
+    """
+    Estado de uma partida simulada em memória por este worker.
+    """
+    def __init__(self, match_id, state):
+        self.match_id = match_id
+        self.state = state
+        self.task = None
+        self.last_checkpoint = time.monotonic()
+        self.stats = TickStats()
+        self.tick = 0
+        self.seq = 0  # número de sequência do último estado enviado
+        self.keyframe_seq = 0
+        self.last_broadcast = None
+        self.channels = {}  # user_id -> canal do consumer do jogador
+        self.spectators = {}  # canal do hub de espectadores -> validade do último aviso
+        self.next_spectator_frame = 0.0
+        # lado -> (direção, seq) aguardando os próximos ticks
+        self.inputs = {side: deque(maxlen=INPUT_QUEUE_SIZE) for side in ("left", "right")}
+        self.input_seq = {}  # lado -> última sequência de entrada aceita
+        self.acks = {"left": 0, "right": 0}  # lado -> última sequência de entrada aplicada
+        self.move_budget = {"left": 0.0, "right": 0.0}  # passos de raquete disponíveis por lado
+        self.replay = None  # ReplayRecorder, com GAME_ENGINE["REPLAYS"] ligado
+
+    def queue_input(self, side, direction, seq=None):
+        """
+        Enfileira um movimento. Entradas repetidas ou fora de ordem (seq não
+        maior que a última aceita do mesmo lado) são descartadas.
+        """
+        queue = self.inputs.get(side)
+        if queue is None:
+            return False
+        if seq is not None:
+            if seq <= self.input_seq.get(side, 0):
+                return False
+            self.input_seq[side] = seq
+        queue.append((direction, seq))
+        return True
+
+    def has_inputs(self):
+        return any(self.inputs.values())
+
+    def clear_inputs(self, side=None):
+        """
+        Descarta as entradas pendentes (pausa ou reconexão). As descartadas
+        contam como processadas, para o cliente não continuar a predizê-las.
+        """
+        for queue_side, queue in self.inputs.items():
+            if side is None or queue_side == side:
+                queue.clear()
+                self.acks[queue_side] = self.input_seq.get(queue_side, self.acks[queue_side])
+
+    def drain_inputs(self, tick, allowance):
+        """
+        Aplica, na ordem de chegada, as entradas pendentes antes do passo `tick`.
+        Cada lado ganha `allowance` passos de raquete por tick (limite de
+        velocidade); o excesso fica na fila para os ticks seguintes.
+        """
+        burst = max(INPUT_BURST, allowance)
+        for side, queue in self.inputs.items():
+            budget = min(self.move_budget[side] + allowance, burst)
+            while queue and budget >= 1:
+                direction, seq = queue.popleft()
+                budget -= 1
+                apply_input(self.state, side, direction)
+                if seq is not None:
+                    self.acks[side] = seq
+                if self.replay is not None:
+                    self.replay.input(tick, side, direction)
+            self.move_budget[side] = budget
+
+
+class MatchEngine:
+    """
+    Runtime que mantém as partidas vivas na memória do processo.
+
+    As partidas são distribuídas entre os workers por hash consistente sobre
+    o registro de engines vivos (`pong:engines`, com heartbeat). Quando um
+    worker sai do anel, as partidas dele são adotadas pelo novo dono do shard.
+
+    Cada partida tem um único dono: o worker que conseguir gravar o lease
+    `pong:match:<id>:owner` no Redis (SET NX com TTL, renovado a cada checkpoint).
+    O valor do lease é o canal do engine dono, para que consumers de outros
+    workers encaminhem comandos (movimentos, pausa, saída) pelo channel layer.
+    O Redis recebe apenas snapshots periódicos e os feitos em pausa, fim e WO;
+    cada snapshot renova o TTL do estado. Um reaper por worker finaliza as
+    partidas que ficaram sem atividade e sem dono.
+
+    As mensagens da partida vão direto aos canais dos jogadores (hash
+    `pong:match:<id>:channels`), sem o group_send por quadro; consumers deste
+    mesmo processo são chamados diretamente, sem passar pelo channel layer.
+    """
+    def __init__(self):
+        self.matches = {}
+        self.starting = {}  # match_id -> comandos recebidos enquanto a partida é carregada
+        self.channel_name = None
+        self.listener_task = None
+        self.reaper_task = None
+        self.membership_task = None
+        self.ring = HashRing()
+        self.adopted = 0
+        self.local_consumers = {}
+        self.reaped = 0
+        # Modo "batch": arrays com todas as partidas do worker e o laço que os avança
+        self.batch = None
+        self.batch_task = None
+        self.batch_inputs = set()
+        self.batch_stats = TickStats()
+
+    def register_consumer(self, channel_name, consumer):
+        self.local_consumers[channel_name] = consumer
+
+    def unregister_consumer(self, channel_name):
+        self.local_consumers.pop(channel_name, None)
+
+    @property
+    def config(self):
+        return settings.GAME_ENGINE
+
+    def move_allowance(self):
+        """
+        Passos de raquete (PADDLE_STEP) que cada jogador pode dar por tick.
+        """
+        return self.config["PADDLE_MAX_SPEED"] / self.config["TICK_RATE"] / PADDLE_STEP
+
+    def get_stats(self):
+        """
+        Contadores de tick das partidas simuladas por este worker.
+        """
+        return {
+            "tick_rate": self.config["TICK_RATE"],
+            "broadcast_rate": self.config["BROADCAST_RATE"],
+            "matches": {match_id: live.stats.snapshot() for match_id, live in self.matches.items()},
+            "reaped": self.reaped,
+            "shard": {"channel": self.channel_name, "engines": len(self.ring), "adopted": self.adopted},
+            "replay_bytes": replay_writer.written,
+            "metrics": game_metrics.snapshot(),
+            "physics": self.config["PHYSICS"],
+            "batch": dict(self.batch_stats.snapshot(), size=len(self.batch)) if self.batch is not None else None,
+        }
+
+    def metrics_snapshot(self):
+        """
+        Snapshot publicado no Redis a cada heartbeat (ver game/metrics.py).
+        """
+        return {
+            "matches": len(self.matches),
+            "metrics": game_metrics.snapshot(),
+            "redis_pool": pool_metrics.snapshot(),
+        }
+
+    async def ensure_listener(self):
+        if self.listener_task is None or self.listener_task.done():
+            self.channel_name = await get_channel_layer().new_channel()
+            self.listener_task = asyncio.create_task(self.listen())
+        if self.reaper_task is None or self.reaper_task.done():
+            self.reaper_task = asyncio.create_task(self.reaper())
+        if self.membership_task is None or self.membership_task.done():
+            self.membership_task = asyncio.create_task(self.membership())
+
+    async def listen(self):
+        """
+        Recebe comandos enviados por consumers e engines de outros workers.
+        """
+        channel_layer = get_channel_layer()
+        while True:
+            try:
+                message = await channel_layer.receive(self.channel_name)
+                if message["command"].get("action") == "start":
+                    await self.start_match(message["match_id"])
+                else:
+                    await self.handle(message["match_id"], message["command"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                game_metrics.count_error("command")
+                print(f"Erro ao processar comando recebido pelo engine: {e}")
+
+    async def membership(self):
+        """
+        Heartbeat no registro de engines, atualização do anel de hash
+        consistente e adoção das partidas que ficaram sem dono.
+        """
+        while True:
+            try:
+                await self.refresh_ring()
+                await self.adopt_orphans()
+                await save_metrics(self.channel_name, self.metrics_snapshot(), self.config["ENGINE_TTL"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                game_metrics.count_error("membership")
+                print(f"Erro ao atualizar o registro de engines: {e}")
+            await asyncio.sleep(self.config["ENGINE_HEARTBEAT"])
+
+    async def refresh_ring(self):
+        engines = await heartbeat_engine(self.channel_name, self.config["ENGINE_TTL"])
+        if frozenset(engines) != self.ring.nodes:
+            self.ring = HashRing(engines, self.config["RING_VNODES"])
+            print(f"Anel de engines atualizado: {len(self.ring)} engine(s) ativo(s).")
+
+    async def shard_for(self, match_id):
+        """
+        Canal do engine que deve simular a partida, segundo o anel de hash consistente.
+        """
+        if not len(self.ring):
+            await self.refresh_ring()
+        return self.ring.node_for(match_id)
+
+    async def request_start(self, match_id):
+        """
+        Pede ao engine do shard da partida que a coloque em simulação.
+        """
+        await self.ensure_listener()
+        match_id = str(match_id)
+        shard = await self.shard_for(match_id)
+        if shard is None or shard == self.channel_name:
+            return await self.start_match(match_id)
+
+        await get_channel_layer().send(shard, {
+            "type": "engine.command",
+            "match_id": match_id,
+            "command": {"action": "start"},
+        })
+        return True
+
+    async def adopt_orphans(self):
+        """
+        Handoff: partidas recentes do nosso shard que estão sem lease de dono
+        (o engine anterior caiu ou saiu do anel) voltam a ser simuladas aqui a
+        partir do último snapshot no Redis.
+        """
+        redis_client = get_redis()
+        for match_id in await recent_matches(self.config["ABANDON_AFTER"]):
+            if match_id in self.matches or match_id in self.starting or self.ring.node_for(match_id) != self.channel_name:
+                continue
+            if await redis_client.exists(owner_key(match_id)):
+                continue
+            state = await load_state(match_id)
+            # Só partidas que já tiveram os dois jogadores (e, portanto, um engine)
+            if state is None or not state.players or len(state.initial_players) < 2:
+                continue
+            if await self.start_match(match_id):
+                self.adopted += 1
+                print(f"Partida {match_id} sem engine dono. Simulação assumida por este worker.")
+
+    async def reaper(self):
+        """
+        Finaliza periodicamente as partidas abandonadas (ex.: worker que caiu no meio do jogo).
+        """
+        while True:
+            try:
+                await asyncio.sleep(self.config["REAPER_INTERVAL"])
+                await self.reap_abandoned()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                game_metrics.count_error("reaper")
+                print(f"Erro ao procurar partidas abandonadas: {e}")
+
+    async def reap_abandoned(self):
+        """
+        Partidas sem atividade há ABANDON_AFTER segundos e sem engine dono: com
+        um só jogador restante, finaliza por WO; sem jogadores ativos, remove o
+        estado. Partidas ainda esperando o segundo jogador ficam para o TTL.
+        """
+        redis_client = get_redis()
+        lease_ms = int(self.config["LEASE_TTL"] * 1000)
+        for match_id in await stale_matches(self.config["ABANDON_AFTER"]):
+            if match_id in self.matches:
+                continue
+            # O lease impede que um engine assuma a partida durante a finalização
+            if not await redis_client.set(owner_key(match_id), self.channel_name, nx=True, px=lease_ms):
+                continue
+            try:
+                state = await load_state(match_id)
+                if state is None:
+                    await forget_match(match_id)
+                elif len(state.players) == 1 and len(state.initial_players) == 2:
+                    print(f"Partida {match_id} abandonada. Finalizando partida por WO.")
+                    await finalize_match_by_wo(match_id, state)
+                    self.reaped += 1
+                elif len(state.players) != 1:
+                    print(f"Partida {match_id} abandonada sem jogadores ativos. Removendo estado.")
+                    await delete_match(match_id)
+                    self.reaped += 1
+            finally:
+                await redis_client.eval(RELEASE_LEASE_SCRIPT, 1, owner_key(match_id), self.channel_name)
+
+    async def start_match(self, match_id):
+        """
+        Tenta assumir a simulação da partida. Retorna False se outro worker já for o dono.
+        """
+        match_id = str(match_id)
+        if match_id in self.matches or match_id in self.starting:
+            return True
+
+        await self.ensure_listener()
+        redis_client = get_redis()
+        lease_ms = int(self.config["LEASE_TTL"] * 1000)
+        acquired = await redis_client.set(owner_key(match_id), self.channel_name, nx=True, px=lease_ms)
+        if not acquired:
+            return False
+
+        # Com o lease, este worker já é o dono: comandos (entrada do segundo
+        # jogador, movimentos) que chegarem durante as leituras abaixo ficam
+        # guardados e são aplicados assim que a partida estiver na memória.
+        self.starting[match_id] = []
+        try:
+            state = await load_state(match_id)
+            if state is None:
+                await redis_client.eval(RELEASE_LEASE_SCRIPT, 1, owner_key(match_id), self.channel_name)
+                return False
+
+            live = LiveMatch(match_id, state)
+            live.channels = await get_channels(match_id)
+            if self.config["REPLAYS"]:
+                live.replay = ReplayRecorder(match_id, self.config["TICK_RATE"])
+            self.matches[match_id] = live
+        finally:
+            pending = self.starting.pop(match_id)
+
+        for command in pending:
+            await self.handle(match_id, command)
+        if state.wo_pending:
+            # Um jogador saiu durante a carga e a partida já foi finalizada por WO
+            del self.matches[match_id]
+            await redis_client.eval(RELEASE_LEASE_SCRIPT, 1, owner_key(match_id), self.channel_name)
+            return True
+        live.task = asyncio.create_task(self.run(live))
+        print(f"Engine assumiu a partida {match_id}.")
+        return True
+
+    async def dispatch(self, match_id, command):
+        """
+        Entrega um comando ao engine dono da partida, local ou remoto.
+        Retorna False se nenhum worker estiver simulando a partida.
+        """
+        match_id = str(match_id)
+        if match_id in self.matches or match_id in self.starting:
+            await self.handle(match_id, command)
+            return True
+
+        started = time.perf_counter()
+        owner = await get_redis().get(owner_key(match_id))
+        game_metrics.observe_redis("owner", time.perf_counter() - started)
+        if not owner or owner == self.channel_name:
+            return False
+
+        await get_channel_layer().send(owner, {
+            "type": "engine.command",
+            "match_id": match_id,
+            "command": command,
+        })
+        return True
+
+    async def handle(self, match_id, command):
+        if match_id in self.starting:
+            self.starting[match_id].append(command)
+            return
+        live = self.matches.get(match_id)
+        if live is None:
+            return
+
+        state = live.state
+        action = command.get("action")
+        match_status = state.status
+
+        if action == "move":
+            # Aplicado no próximo tick da simulação, não aqui
+            if match_status == "paused":
+                return
+            seq = command.get("seq")
+            if live.queue_input(command["side"], command.get("direction"), seq if isinstance(seq, int) else None):
+                if self.batch is not None and match_id in self.batch:
+                    self.batch_inputs.add(match_id)
+
+        elif action == "resync":
+            await self.send_keyframe(live, command["reply_channel"])
+
+        elif action == "join":
+            state.players[command["user_id"]] = command["side"]
+            # Um cliente novo recomeça sua sequência de entradas
+            live.clear_inputs(command["side"])
+            live.input_seq.pop(command["side"], None)
+            live.acks[command["side"]] = 0
+            if command.get("channel_name"):
+                live.channels[command["user_id"]] = command["channel_name"]
+            if command["user_id"] not in state.initial_players:
+                state.initial_players.append(command["user_id"])
+
+        elif action == "leave":
+            state.players.pop(command["user_id"], None)
+            live.channels.pop(command["user_id"], None)
+            if len(state.players) == 1 and match_status == "ongoing":
+                await self.walkover(live)
+
+        elif action == "spectator_join":
+            # Repetido periodicamente pelo hub enquanto houver espectadores nele
+            live.spectators[command["hub"]] = time.monotonic() + self.config["SPECTATOR_HEARTBEAT"] * 3
+
+        elif action == "spectator_leave":
+            live.spectators.pop(command["hub"], None)
+
+        elif action == "pause":
+            if match_status != "ongoing":
+                print(f"Não é possível pausar a partida {match_id} pois já está em estado {match_status}.")
+                return
+            state.status = "paused"
+            self.set_batch_active(live, False)
+            await self.snapshot(live)
+            await self.publish(live, "paused", {"message": "A partida foi pausada."})
+
+        elif action == "resume":
+            if match_status != "paused":
+                print(f"Não é possível retomar a partida {match_id} pois está em estado {match_status}.")
+                return
+            state.status = "ongoing"
+            await self.snapshot(live)
+            await self.publish(live, "resumed", {"message": "A partida foi retomada."})
+
+    async def publish(self, live, message_type, data):
+        """
+        Entrega uma mensagem aos jogadores da partida pelo caminho mais curto:
+        chamada direta ao consumer local, channel_layer.send para os remotos.
+        Sem o canal de algum jogador, usa o grupo da partida. Espectadores
+        recebem os avisos pelo próprio grupo; o estado chega a eles pelo
+        fluxo de menor taxa de `send_spectator_frame`.
+        """
+        event = {"type": "game_update", "message_type": message_type, "state": data}
+        started = time.perf_counter()
+        if len(live.channels) < len(live.state.players):
+            await send_to_group(live.match_id, message_type, data)
+            game_metrics.observe_send("group", time.perf_counter() - started)
+        else:
+            for channel_name in list(live.channels.values()):
+                await self.send_to_channel(channel_name, event)
+            game_metrics.observe_send("players", time.perf_counter() - started)
+
+        if message_type not in ("state_update", "state_delta"):
+            await self.send_to_spectators(live, message_type, data)
+
+    def has_spectators(self, live):
+        now = time.monotonic()
+        for hub, expires in list(live.spectators.items()):
+            if expires < now:
+                del live.spectators[hub]
+        return bool(live.spectators)
+
+    async def send_to_spectators(self, live, message_type, data):
+        """
+        Um único group_send por mensagem: os membros do grupo são os hubs de
+        espectadores (um por worker), que repassam aos seus consumers.
+        """
+        if not self.has_spectators(live):
+            return
+        started = time.perf_counter()
+        try:
+            await get_channel_layer().group_send(spectator_group_name(live.match_id), {
+                "type": "game_update",
+                "match_id": live.match_id,
+                "message_type": message_type,
+                "state": data,
+            })
+            game_metrics.observe_send("spectators", time.perf_counter() - started)
+        except Exception as e:
+            game_metrics.count_error("spectators")
+            print(f"Erro ao enviar mensagem aos espectadores da partida {live.match_id}: {e}")
+
+    async def send_spectator_frame(self, live, payload):
+        """
+        Estado completo para os espectadores, em SPECTATOR_RATE quadros por
+        segundo, enviado depois dos quadros dos jogadores.
+        """
+        now = time.monotonic()
+        if now < live.next_spectator_frame:
+            return
+        live.next_spectator_frame = now + 1 / self.config["SPECTATOR_RATE"]
+        await self.send_to_spectators(live, "state_update", payload)
+
+    async def send_to_channel(self, channel_name, event):
+        consumer = self.local_consumers.get(channel_name)
+        try:
+            if consumer is not None:
+                await consumer.game_update(event)
+            else:
+                await get_channel_layer().send(channel_name, event)
+        except Exception as e:
+            game_metrics.count_error("send")
+            print(f"Erro ao enviar mensagem para o canal {channel_name}: {e}")
+
+    async def broadcast_state(self, live):
+        """
+        Envia o estado atual: um keyframe completo (state_update) a cada
+        KEYFRAME_INTERVAL envios ou quando algo além de bola/raquetes/placar
+        mudou, e um state_delta só com os campos alterados nos demais.
+        """
+        payload = broadcast_payload(live.state, live.tick, live.acks)
+        previous = live.last_broadcast
+        live.last_broadcast = payload
+        live.seq += 1
+
+        delta = None
+        if previous is not None and live.seq - live.keyframe_seq < self.config["KEYFRAME_INTERVAL"]:
+            delta = build_delta(previous, payload)
+
+        if delta is None:
+            live.keyframe_seq = live.seq
+            if live.replay is not None:
+                live.replay.keyframe(live.tick, live.state)
+            await self.publish(live, "state_update", dict(payload, seq=live.seq))
+        else:
+            delta["seq"] = live.seq
+            await self.publish(live, "state_delta", delta)
+        await self.send_spectator_frame(live, payload)
+
+    async def send_keyframe(self, live, channel_name):
+        """
+        Reenvia a um único cliente o último estado transmitido (pedido de resync).
+        """
+        if live.last_broadcast is None:
+            return
+        await self.send_to_channel(channel_name, {
+            "type": "game_update",
+            "message_type": "state_update",
+            "state": dict(live.last_broadcast, seq=live.seq),
+        })
+
+    async def walkover(self, live):
+        state = live.state
+        state.status = "paused"
+        state.wo_pending = True
+        state.wo_initiated_at = datetime.utcnow().isoformat()
+        await self.snapshot(live)
+        await self.stop(live)
+        print(f"Partida {live.match_id} pausada. Finalizando partida por WO imediatamente.")
+        await finalize_match_by_wo(live.match_id, state)
+
+    async def stop(self, live):
+        if live.task and live.task is not asyncio.current_task():
+            live.task.cancel()
+            await asyncio.gather(live.task, return_exceptions=True)
+
+    def sync_state(self, live):
+        """
+        No modo em lote, traz para o dicionário de estado a física guardada nos arrays.
+        """
+        if self.batch is not None and live.match_id in self.batch:
+            live.tick = self.batch.store(live.match_id, live.state)
+
+    def set_batch_active(self, live, active):
+        if self.batch is not None:
+            self.sync_state(live)
+            self.batch.set_active(live.match_id, active)
+
+    def ensure_batch(self):
+        if self.batch is None:
+            # Import tardio: o NumPy só é necessário no modo em lote
+            from .batch_physics import BatchSimulation
+            self.batch = BatchSimulation()
+        if self.batch_task is None or self.batch_task.done():
+            self.batch_task = asyncio.create_task(self.run_batch())
+        return self.batch
+
+    async def run_batch(self):
+        """
+        Laço único do modo em lote: a cada tick, aplica as entradas pendentes e
+        avança todas as partidas ativas do worker com um passo vetorizado.
+        Envios, pausas, checkpoints e finalização seguem no `run` de cada partida.
+        """
+        dt = 1 / self.config["TICK_RATE"]
+        max_steps = self.config["MAX_STEPS_PER_FRAME"]
+        allowance = self.move_allowance()
+        batch = self.batch
+        previous = time.monotonic()
+        accumulator = 0.0
+        try:
+            while len(batch):
+                now = time.monotonic()
+                accumulator += now - previous
+                previous = now
+                steps = 0
+                work_started = time.perf_counter()
+                while accumulator >= dt and steps < max_steps:
+                    # Partidas com entradas além do limite de velocidade continuam na lista
+                    pending = set()
+                    for match_id in self.batch_inputs:
+                        live = self.matches.get(match_id)
+                        if live is not None and match_id in batch:
+                            live.drain_inputs(batch.tick(match_id), allowance)
+                            batch.set_paddles(match_id, live.state)
+                            if live.has_inputs():
+                                pending.add(match_id)
+                    self.batch_inputs = pending
+                    batch.step(dt)
+                    # Partida decidida para de andar até o `run` finalizá-la
+                    for match_id in batch.finished(WINNING_SCORE):
+                        batch.set_active(match_id, False)
+                    accumulator -= dt
+                    steps += 1
+                self.batch_stats.record_frame(steps, accumulator, dt)
+                dropped = 0
+                if steps >= max_steps and accumulator >= dt:
+                    dropped = int(accumulator // dt)
+                    accumulator %= dt
+                game_metrics.record_frame(steps, time.perf_counter() - work_started, dropped)
+                await sleep_until(previous + dt - accumulator)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            game_metrics.count_error("batch")
+            print(f"Erro no laço de simulação em lote: {e}")
+
+    async def snapshot(self, live):
+        """
+        Grava no Redis os campos controlados pelo engine; os do roster ficam com os consumers.
+        """
+        self.sync_state(live)
+        started = time.perf_counter()
+        await save_fields(live.match_id, live.state, ENGINE_FIELDS)
+        game_metrics.observe_redis("snapshot", time.perf_counter() - started)
+
+    async def checkpoint(self, live):
+        """
+        Snapshot periódico + renovação do lease. Retorna False se o lease foi perdido.
+        """
+        live.last_checkpoint = time.monotonic()
+        await self.snapshot(live)
+        if live.replay is not None:
+            live.replay.flush()
+        lease_ms = int(self.config["LEASE_TTL"] * 1000)
+        started = time.perf_counter()
+        renewed = await get_redis().eval(
+            RENEW_LEASE_SCRIPT, 1, owner_key(live.match_id), self.channel_name, lease_ms
+        )
+        game_metrics.observe_redis("lease", time.perf_counter() - started)
+        return bool(renewed)
+
+    async def countdown(self, live):
+        for i in range(3, 0, -1):
+            print(f"Enviando contagem regressiva: {i}")
+            await self.publish(live, "countdown", {"message": str(i)})
+            await asyncio.sleep(1)
+        live.state.ball_speed_x = 200
+        live.state.ball_speed_y = 100
+        if live.replay is not None:
+            live.replay.keyframe(live.tick, live.state)
+        await self.checkpoint(live)
+        print("Contagem regressiva concluída. Jogo iniciado.")
+        await self.publish(live, "game_start", {"message": "start"})
+
+    async def run(self, live):
+        match_id = live.match_id
+        state = live.state
+        dt = 1 / self.config["TICK_RATE"]
+        broadcast_interval = 1 / self.config["BROADCAST_RATE"]
+        max_steps = self.config["MAX_STEPS_PER_FRAME"]
+        allowance = self.move_allowance()
+        batch = None
+        try:
+            await self.countdown(live)
+            if self.config["PHYSICS"] == "batch":
+                batch = self.ensure_batch()
+                batch.add(match_id, state, live.tick)
+                if live.has_inputs():
+                    self.batch_inputs.add(match_id)
+            previous = time.monotonic()
+            next_broadcast = previous
+            accumulator = 0.0
+            while True:
+                num_players = len(state.players)
+
+                if num_players < 2:
+                    if state.status == "ongoing":
+                        state.status = "paused"
+                        await self.snapshot(live)
+                        await self.publish(live, "paused", {"message": "Jogo pausado automaticamente por falta de jogadores."})
+                        print(f"Jogo {match_id} pausado automaticamente. Jogadores conectados: {num_players}")
+                    if num_players == 0:
+                        print(f"Finalizando e removendo partida {match_id} por falta de jogadores.")
+                        await delete_match(match_id)
+                        break
+
+                if state.status == "paused":
+                    self.set_batch_active(live, False)
+                    live.clear_inputs()
+                    if not await self.checkpoint(live):
+                        print(f"Lease da partida {match_id} perdido. Encerrando simulação local.")
+                        break
+                    await asyncio.sleep(1)
+                    # O tempo em pausa não deve virar passos de recuperação
+                    previous = time.monotonic()
+                    accumulator = 0.0
+                    continue
+
+                if batch is not None:
+                    # Os passos vêm do laço em lote; aqui o estado só é
+                    # sincronizado na taxa de envio
+                    batch.set_active(match_id, True)
+                    self.ensure_batch()
+                    await sleep_until(next_broadcast)
+                    if state.status == "paused":
+                        continue
+                    now = time.monotonic()
+                    tick = live.tick
+                    self.sync_state(live)
+                    steps = live.tick - tick
+                else:
+                    # Acumulador de passo fixo: o tempo real decorrido vira passos de
+                    # `dt`, com passos extras de recuperação quando o worker atrasa.
+                    now = time.monotonic()
+                    accumulator += now - previous
+                    previous = now
+                    steps = 0
+                    work_started = time.perf_counter()
+                    while accumulator >= dt and steps < max_steps:
+                        live.drain_inputs(live.tick, allowance)
+                        step_ball(state, dt)
+                        live.tick += 1
+                        accumulator -= dt
+                        steps += 1
+                        if state.winner_side(WINNING_SCORE):
+                            break
+                    live.stats.record_frame(steps, accumulator, dt)
+                    dropped = 0
+                    if steps >= max_steps and accumulator >= dt:
+                        # Atraso maior que o limite de recuperação: descarta o excesso
+                        dropped = int(accumulator // dt)
+                        accumulator %= dt
+                    game_metrics.record_frame(steps, time.perf_counter() - work_started, dropped)
+
+                # A simulação roda em TICK_RATE, mas a rede só recebe BROADCAST_RATE
+                # snapshots por segundo; o cliente interpola entre eles.
+                if steps and now >= next_broadcast:
+                    await self.broadcast_state(live)
+                    next_broadcast += broadcast_interval
+                    if next_broadcast < now:
+                        next_broadcast = now + broadcast_interval
+
+                if state.winner_side(WINNING_SCORE):
+                    print("Limite de pontos atingido. Finalizando partida por pontuação.")
+                    await self.snapshot(live)
+                    await self.broadcast_state(live)
+                    await asyncio.sleep(0.5)
+                    await finalize_match_by_points(match_id, state)
+                    break
+
+                if time.monotonic() - live.last_checkpoint >= self.config["SNAPSHOT_INTERVAL"]:
+                    if not await self.checkpoint(live):
+                        print(f"Lease da partida {match_id} perdido. Encerrando simulação local.")
+                        break
+
+                if batch is None:
+                    # Dorme até o próximo passo previsto, descontando o trabalho já feito
+                    await sleep_until(previous + dt - accumulator)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            game_metrics.count_error("loop")
+            print(f"Erro no game loop da partida {match_id}: {e}")
+        finally:
+            if live.replay is not None:
+                # Último keyframe e envio do que restou; o arquivo é associado à partida
+                self.sync_state(live)
+                live.replay.keyframe(live.tick, state)
+                live.replay.flush(final=True)
+            if batch is not None:
+                batch.remove(match_id)
+                self.batch_inputs.discard(match_id)
+            if state.winner_side(WINNING_SCORE) or state.wo_pending:
+                await self.send_to_spectators(live, "match_ended", state.to_wire())
+            if self.matches.get(match_id) is live:
+                del self.matches[match_id]
+            try:
+                await get_redis().eval(RELEASE_LEASE_SCRIPT, 1, owner_key(match_id), self.channel_name)
+            except Exception as e:
+                print(f"Erro ao liberar o lease da partida {match_id}: {e}")
+
+
+match_engine = MatchEngine()
@@ -0,0 +1,264 @@
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+
+from .leaderboard import record_match
+from .match_store import delete_match
+from .metrics import game_metrics
+
+# Finalização das partidas (por WO ou por pontuação). As funções recebem o
+# estado da partida (MatchState) já carregado, para poderem ser chamadas tanto pelo
+# GameConsumer quanto pelo engine que simula a partida.
+#
+# O banco é atualizado por `complete_match`, numa única transação, fora do
+# event loop: as chamadas usam thread_sensitive=False para não disputarem a
+# thread única que o asgiref reserva ao código síncrono dos consumers.
+
+
+def off_loop(func):
+    """
+    Versão assíncrona de uma função que usa o ORM, executada no pool de threads.
+    """
+    return database_sync_to_async(func, thread_sensitive=False)
+
+
+def user_languages(*user_ids):
+    """
+    Idioma de cada usuário ({id em texto: idioma}), numa única consulta.
+    """
+    from django.contrib.auth import get_user_model
+
+    users = get_user_model().objects.filter(id__in=[uid for uid in user_ids if uid is not None])
+    return {str(uid): language or "pt_BR" for uid, language in users.values_list("id", "current_language")}
+
+
+async def send_to_group(match_id, message_type, data):
+    try:
+        await get_channel_layer().group_send(
+            f"match_{match_id}",
+            {
+                "type": "game_update",
+                "message_type": message_type,
+                "state": data
+            }
+        )
+    except Exception as e:
+        game_metrics.count_error("group_send")
+        print(f"Erro ao enviar mensagem para o grupo match_{match_id}: {e}")
+
+
+async def finalize_match_by_wo(match_id, game_state):
+    """
+    Finaliza a partida por WO (walkover).
+    """
+    if len(game_state.players) == 1:
+        winner_id = list(game_state.players.keys())[0]
+        loser_id = None
+        for pid in game_state.initial_players:
+            if pid != winner_id:
+                loser_id = pid
+                break
+
+        tournament_id = game_state.tournament_id
+        print(f"[DEBUG] tournament_id: {tournament_id}")
+        redirect_url = "/tournaments/" if tournament_id else "/chat/"
+
+        # Dicionário de traduções
+        messages = {
+            "pt_BR": {
+                "message": "Partida finalizada por WO.",
+                "final_alert": "Partida finalizada por WO! Clique em OK para sair da partida."
+            },
+            "en": {
+                "message": "Match ended by walkover.",
+                "final_alert": "Match ended by walkover! Click OK to exit the match."
+            },
+            "es": {
+                "message": "Partido finalizado por WO.",
+                "final_alert": "Partido finalizado por WO! Haga clic en OK para salir del partido."
+            }
+        }
+
+        languages = await off_loop(user_languages)(winner_id)
+        user_language = languages.get(str(winner_id), "pt_BR")
+        msg_data = messages.get(user_language, messages["pt_BR"])
+
+        await send_to_group(match_id, "walkover", {
+            "message": msg_data["message"],
+            "redirect_url": redirect_url,
+            "winner": winner_id,
+            "loser": loser_id,
+            "tournament_id": tournament_id,
+            "final_alert": msg_data["final_alert"]
+        })
+
+        # Atualiza o banco de dados (match, stats e, se for o caso, o torneio)
+        try:
+            match = await off_loop(complete_match)(match_id, winner_id, by_wo=True)
+            if match is not None:
+                await record_match(match)
+        except Exception as e:
+            print(f"Erro ao atualizar partida por WO no banco: {e}")
+    else:
+        print("Finalização por WO não executada – quantidade inesperada de jogadores.")
+
+    await delete_match(match_id)
+
+
+async def finalize_match_by_points(match_id, game_state):
+    """
+    Finaliza a partida por pontuação.
+    """
+    # Determina vencedor e perdedor
+    if game_state.score_left >= 5:
+        winner_side = "left"
+        loser_side = "right"
+    else:
+        winner_side = "right"
+        loser_side = "left"
+
+    winner_id = None
+    loser_id = None
+    for uid, side in game_state.players.items():
+        if side == winner_side:
+            winner_id = uid
+        elif side == loser_side:
+            loser_id = uid
+
+    tournament_id = game_state.tournament_id
+    redirect_url = "/tournaments/" if tournament_id else "/chat/"
+
+    languages = await off_loop(user_languages)(winner_id, loser_id)
+    winner_language = languages.get(str(winner_id), "pt_BR")
+    loser_language = languages.get(str(loser_id), "pt_BR")
+
+    print(f"Winner (ID: {winner_id}) language: {winner_language}")
+    print(f"Loser (ID: {loser_id}) language: {loser_language}")
+
+    message_translations = {
+        "pt_BR": "Partida finalizada por pontuação.",
+        "en": "Match finished by points.",
+        "es": "Partido finalizado por puntuación."
+    }
+    common_message = message_translations.get(winner_language, message_translations["pt_BR"])
+
+    final_alert_translations = {
+        "pt_BR": {
+            "winner": "VENCEU!!! Partida finalizada! Clique em OK para sair da partida.",
+            "loser": "PERDEU!!! Partida finalizada! Clique em OK para sair da partida."
+        },
+        "en": {
+            "winner": "WON!!! Match finished! Click OK to exit the match.",
+            "loser": "LOST!!! Match finished! Click OK to exit the match."
+        },
+        "es": {
+            "winner": "¡¡¡GANADO!!! ¡Partido terminado! Haz clic en OK para salir del partido.",
+            "loser": "¡¡¡PERDIDO!!! ¡Partido terminado! Haz clic en OK para salir del partido"
+        }
+    }
+    winner_final_alert = final_alert_translations.get(winner_language, final_alert_translations["pt_BR"])["winner"]
+    loser_final_alert = final_alert_translations.get(loser_language, final_alert_translations["pt_BR"])["loser"]
+
+    final_alert = {
+        str(winner_id): winner_final_alert,
+        str(loser_id): loser_final_alert,
+    }
+
+    await send_to_group(match_id, "match_finished", {
+        "message": common_message,
+        "redirect_url": redirect_url,
+        "winner": winner_id,
+        "loser": loser_id,
+        "tournament_id": tournament_id,
+        "final_alert": final_alert
+    })
+
+    try:
+        match = await off_loop(complete_match)(match_id, winner_id, (game_state.score_left, game_state.score_right))
+        if match is not None:
+            await record_match(match)
+    except Exception as e:
+        print(f"Erro ao atualizar partida por pontos: {e}")
+
+    await delete_match(match_id)
+
+
+def complete_match(match_id, winner_id, scores=None, by_wo=False):
+    """
+    Conclui a partida numa única transação: resultado, vitórias e derrotas,
+    +3 pontos no torneio e, se for a última partida dele, o vencedor do torneio.
+
+    `scores` é o placar (player1, player2); no WO fica 1 x 0 para o vencedor.
+    A linha da partida é travada (select_for_update), então uma partida já
+    concluída não é contada duas vezes: nesse caso retorna None. Senão,
+    retorna a partida atualizada, com `tournament_winner_id` (e o vencedor
+    anterior, `previous_tournament_winner_id`) preenchido quando ela concluiu
+    o torneio.
+    """
+    from django.apps import apps
+    from .stats import add_tournament_points, record_match_result
+
+    GameMatch = apps.get_model("game", "Match")
+
+    with transaction.atomic():
+        match = GameMatch.objects.select_for_update().filter(pk=match_id).first()
+        if match is None or match.status == "completed":
+            return None
+
+        if str(match.player1_id) == str(winner_id):
+            winner_id, loser_id = match.player1_id, match.player2_id
+        elif str(match.player2_id) == str(winner_id):
+            winner_id, loser_id = match.player2_id, match.player1_id
+        else:
+            raise ValueError(f"Usuário {winner_id} não joga a partida {match_id}.")
+
+        if by_wo:
+            scores = (1, 0) if winner_id == match.player1_id else (0, 1)
+        now = timezone.now()
+        match.score_player1, match.score_player2 = scores
+        match.winner_id = winner_id
+        match.is_winner_by_wo = by_wo
+        match.status = "completed"
+        match.played_at = now
+        match.last_updated = now
+        match.save(update_fields=[
+            "score_player1", "score_player2", "winner_id", "is_winner_by_wo", "status", "played_at", "last_updated",
+        ])
+
+        record_match_result(winner_id, loser_id)
+        match.tournament_winner_id = None
+        match.previous_tournament_winner_id = None
+
+        if match.tournament_id:
+            if not add_tournament_points(match.tournament_id, winner_id):
+                print(f"[DEBUG] TournamentParticipant não encontrado para tournament_id={match.tournament_id} e user_id={winner_id}")
+            if match.last_tournament_match:
+                match.previous_tournament_winner_id, match.tournament_winner_id = complete_tournament(
+                    match.tournament_id
+                )
+
+    print(f"[DEBUG] Partida {match_id} concluída: vencedor {winner_id}, perdedor {loser_id}, placar {scores}")
+    return match
+
+
+def complete_tournament(tournament_id):
+    """
+    Define o vencedor do torneio (participante com mais pontos) e o conclui.
+    Deve ser chamada dentro da transação de `complete_match`. Retorna
+    (vencedor anterior, vencedor), lidos com o torneio travado: o vencedor
+    pode já ter sido definido pela API ou pelo tournament_manager.
+    """
+    from django.apps import apps
+    from .stats import set_tournament_winner, tournament_leader
+
+    Tournament = apps.get_model("game", "Tournament")
+    previous_winner_id = (
+        Tournament.objects.select_for_update().filter(pk=tournament_id).values_list("winner_id", flat=True).first()
+    )
+    winner_id = tournament_leader(tournament_id)
+    if winner_id is None:
+        return previous_winner_id, previous_winner_id
+    set_tournament_winner(tournament_id, winner_id, status="completed")
+    print(f"[DEBUG] Torneio {tournament_id} atualizado com o vencedor {winner_id}")
+    return previous_winner_id, winner_id
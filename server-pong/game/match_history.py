@@ -0,0 +1,159 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import F, Q
+
+from .models import Match
+
+# Histórico de partidas de um usuário, do mais recente para o mais antigo,
+# ordenado por (played_at, id). Partidas sem played_at (não disputadas) vêm
+# por último.
+#
+# A paginação é por keyset: o cursor guarda o (played_at, id) da última
+# partida da página, e a próxima página começa logo depois dele, sem OFFSET.
+# As partidas como player1 e como player2 são lidas em consultas separadas,
+# cada uma pelo seu índice (match_player1_played_idx / match_player2_played_idx),
+# e intercaladas aqui, em vez de um OR que impede o uso dos índices.
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+RESULTS = ("win", "loss", "unplayed")
+ORDERING = (F("played_at").desc(nulls_last=True), "-id")
+# Dentro de um trecho (só com played_at ou só sem) a posição dos NULLs não
+# importa: a ordem simples é a mesma dos índices e vale em qualquer banco.
+SEGMENT_ORDERING = ("-played_at", "-id")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(match):
+    played_at = match.played_at.isoformat() if match.played_at else None
+    raw = json.dumps([played_at, match.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        played_at, match_id = json.loads(raw)
+        return (datetime.fromisoformat(played_at) if played_at else None), int(match_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Cursor inválido.") from e
+
+
+def _segments(cursor):
+    """
+    Trechos do histórico depois do cursor, na ordem: primeiro as partidas com
+    played_at, depois as sem. Cada trecho é um intervalo contínuo do índice
+    (o OR com played_at IS NULL numa consulta só impediria a busca direta
+    pelo cursor e obrigaria o banco a percorrer as partidas já mostradas).
+    """
+    if cursor is None:
+        return [Q(played_at__isnull=False), Q(played_at__isnull=True)]
+    played_at, match_id = cursor
+    if played_at is None:
+        return [Q(played_at__isnull=True, id__lt=match_id)]
+    # played_at <= cursor delimita o intervalo no índice; o OR só desempata o mesmo instante
+    return [
+        Q(played_at__lte=played_at) & (Q(played_at__lt=played_at) | Q(id__lt=match_id)),
+        Q(played_at__isnull=True),
+    ]
+
+
+def _filters(user, tournament_id=None, result=None):
+    conditions = Q()
+    if tournament_id is not None:
+        conditions &= Q(tournament_id=tournament_id)
+    if result == "win":
+        conditions &= Q(winner_id=user.id)
+    elif result == "loss":
+        conditions &= Q(winner_id__isnull=False) & ~Q(winner_id=user.id)
+    elif result == "unplayed":
+        conditions &= Q(winner_id__isnull=True)
+    return conditions
+
+
+def history_queryset(user, tournament_id=None, result=None, opponent_id=None):
+    """
+    Todas as partidas do usuário, na ordem do histórico (usado na exportação).
+    """
+    as_player1 = Q(player1=user)
+    as_player2 = Q(player2=user)
+    if opponent_id is not None:
+        as_player1 &= Q(player2_id=opponent_id)
+        as_player2 &= Q(player1_id=opponent_id)
+    return (
+        Match.objects.filter(as_player1 | as_player2)
+        .filter(_filters(user, tournament_id, result))
+        .select_related("tournament", "player1", "player2")
+        .order_by(*ORDERING)
+    )
+
+
+def history_page(user, cursor=None, limit=DEFAULT_PAGE_SIZE, tournament_id=None, result=None, opponent_id=None):
+    """
+    Uma página do histórico: (partidas, cursor da próxima página ou None).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    conditions = _filters(user, tournament_id, result)
+    segments = _segments(decode_cursor(cursor) if cursor is not None else None)
+
+    as_player1 = Match.objects.filter(conditions, player1=user)
+    as_player2 = Match.objects.filter(conditions, player2=user)
+    if opponent_id is not None:
+        as_player1 = as_player1.filter(player2_id=opponent_id)
+        as_player2 = as_player2.filter(player1_id=opponent_id)
+
+    # limit + 1 de cada lado: o excedente só indica se há próxima página
+    matches = {}
+    for queryset in (as_player1, as_player2):
+        found = 0
+        for segment in segments:
+            rows = list(
+                queryset.filter(segment)
+                .select_related("tournament", "player1", "player2")
+                .order_by(*SEGMENT_ORDERING)[:limit + 1 - found]
+            )
+            for match in rows:
+                matches[match.id] = match
+            found += len(rows)
+            if found > limit:
+                break
+    ordered = sorted(
+        matches.values(),
+        key=lambda match: (match.played_at is not None, match.played_at or datetime.min, match.id),
+        reverse=True,
+    )
+    page = ordered[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(ordered) > limit else None
+    return page, next_cursor
+
+
+def history_entry(match, user):
+    """
+    Uma partida do histórico vista pelo usuário.
+    """
+    # Determina o adversário: se o usuário é player1, o adversário é player2, e vice-versa.
+    opponent = match.player2 if match.player1_id == user.id else match.player1
+
+    # Define o resultado usando winner_id:
+    if match.winner_id is not None:
+        result = "Vitória" if match.winner_id == user.id else "Derrota"
+    else:
+        result = "Não disputada"
+
+    return {
+        "id": match.id,
+        "date": match.played_at,  # Usamos played_at para representar a data da partida
+        "opponent_display_name": opponent.display_name,
+        "opponent_alias": getattr(opponent, "alias", None),
+        "result": result,
+        "score": {
+            "player1": match.score_player1 if match.score_player1 is not None else "-",
+            "player2": match.score_player2 if match.score_player2 is not None else "-",
+        },
+        "tournament_name": match.tournament.name if match.tournament else None,
+    }
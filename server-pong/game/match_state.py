@@ -0,0 +1,138 @@
+from dataclasses import dataclass, field
+
+# Grupos de campos aceitos por `MatchState.to_redis`
+REDIS_FIELDS = ("paddles", "ball", "scores", "status", "wo_pending", "wo_initiated_at", "tournament_id")
+
+
+def _number(value):
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+@dataclass(slots=True)
+class MatchState:
+    """
+    Estado de uma partida. A física fica em atributos planos (sem dicionários
+    aninhados) para o loop de simulação; `to_wire` e `to_redis`/`from_redis`
+    fazem a conversão para os clientes e para o hash da partida no Redis.
+    """
+    players: dict = field(default_factory=dict)  # user_id -> lado ("left"/"right")
+    initial_players: list = field(default_factory=list)
+    paddle_left: float = 300
+    paddle_right: float = 300
+    ball_x: float = 400
+    ball_y: float = 300
+    ball_speed_x: float = 0
+    ball_speed_y: float = 0
+    score_left: int = 0
+    score_right: int = 0
+    status: str = "ongoing"
+    wo_pending: bool = False
+    wo_initiated_at: str | None = None
+    tournament_id: int | None = None
+
+    def paddle(self, side):
+        return self.paddle_left if side == "left" else self.paddle_right
+
+    def set_paddle(self, side, position):
+        if side == "left":
+            self.paddle_left = position
+        else:
+            self.paddle_right = position
+
+    def winner_side(self, winning_score):
+        if self.score_left >= winning_score:
+            return "left"
+        if self.score_right >= winning_score:
+            return "right"
+        return None
+
+    def to_wire(self):
+        """
+        Formato enviado aos clientes (state_update) e usado nos deltas.
+        """
+        return {
+            "players": dict(self.players),
+            "initial_players": list(self.initial_players),
+            "paddles": {"left": self.paddle_left, "right": self.paddle_right},
+            "ball": {
+                "x": self.ball_x,
+                "y": self.ball_y,
+                "speed_x": self.ball_speed_x,
+                "speed_y": self.ball_speed_y,
+            },
+            "scores": {"left": self.score_left, "right": self.score_right},
+            "status": self.status,
+            "wo_pending": self.wo_pending,
+            "wo_initiated_at": self.wo_initiated_at,
+            "tournament_id": self.tournament_id,
+        }
+
+    def to_redis(self, fields=REDIS_FIELDS):
+        """
+        Campos do hash da partida (ver game/match_store.py) para os grupos indicados.
+        """
+        values = {}
+        for name in fields:
+            if name == "paddles":
+                values["paddle:left"] = self.paddle_left
+                values["paddle:right"] = self.paddle_right
+            elif name == "ball":
+                values["ball:x"] = self.ball_x
+                values["ball:y"] = self.ball_y
+                values["ball:speed_x"] = self.ball_speed_x
+                values["ball:speed_y"] = self.ball_speed_y
+            elif name == "scores":
+                values["score:left"] = self.score_left
+                values["score:right"] = self.score_right
+            elif name == "status":
+                values["status"] = self.status
+            elif name == "wo_pending":
+                values["wo_pending"] = "1" if self.wo_pending else "0"
+            elif name == "wo_initiated_at":
+                if self.wo_initiated_at is not None:
+                    values["wo_initiated_at"] = self.wo_initiated_at
+            elif name == "tournament_id":
+                values["tournament_id"] = "" if self.tournament_id is None else self.tournament_id
+        return values
+
+    @classmethod
+    def from_redis(cls, fields):
+        """
+        Monta o estado a partir do HGETALL do hash da partida. Retorna None se ele não existe.
+        """
+        if not fields:
+            return None
+
+        state = cls()
+        order = {}
+        for name, value in fields.items():
+            group, _, key = name.partition(":")
+            if group == "player":
+                state.players[key] = value
+            elif group == "initial":
+                order[key] = int(value)
+            elif group == "paddle":
+                state.set_paddle(key, _number(value))
+            elif name == "ball:x":
+                state.ball_x = _number(value)
+            elif name == "ball:y":
+                state.ball_y = _number(value)
+            elif name == "ball:speed_x":
+                state.ball_speed_x = _number(value)
+            elif name == "ball:speed_y":
+                state.ball_speed_y = _number(value)
+            elif name == "score:left":
+                state.score_left = int(value)
+            elif name == "score:right":
+                state.score_right = int(value)
+            elif name == "status":
+                state.status = value
+            elif name == "wo_pending":
+                state.wo_pending = value == "1"
+            elif name == "wo_initiated_at":
+                state.wo_initiated_at = value
+            elif name == "tournament_id":
+                state.tournament_id = int(value) if value.isdigit() else (value or None)
+        state.initial_players = sorted(order, key=order.get)
+        return state
@@ -0,0 +1,297 @@
+import json
+import time
+
+from django.conf import settings
+
+from setup.redis_pool import get_redis
+from .match_state import MatchState
+
+# Estado das partidas no Redis.
+#
+# As chaves ficam sob o prefixo de GAME_ENGINE["KEY_PREFIX"]:
+#
+#   <prefixo>:match:<id>            estado (hash abaixo), com TTL deslizante
+#   <prefixo>:match:<id>:owner      lease do engine dono da partida
+#   <prefixo>:match:<id>:channels   canais dos consumers dos jogadores
+#   <prefixo>:matches               sorted set id -> última atividade (usado pelo reaper)
+#   <prefixo>:engines               sorted set canal do engine -> último heartbeat
+#   <prefixo>:metrics:<canal>       snapshot das métricas do engine (JSON), com TTL
+#
+# Cada partida é um hash com um campo por valor, para que entrada/saída de
+# jogadores, pausa e snapshots do engine alterem só o que lhes pertence, de
+# forma atômica (scripts Lua), em vez de reescrever um JSON inteiro:
+#
+#   player:<user_id>    lado do jogador conectado ("left"/"right")
+#   initial:<user_id>   ordem de entrada do jogador na partida
+#   paddle:<lado>       posição das raquetes
+#   ball:<x|y|speed_x|speed_y>
+#   score:<lado>
+#   status, wo_pending, wo_initiated_at, tournament_id
+
+# Valores iniciais de uma partida nova (ver JOIN_SCRIPT)
+INITIAL_FIELDS = dict(MatchState().to_redis(("paddles", "ball", "scores")), initial_count=0)
+
+# Cria a partida se preciso e reserva um lado para o jogador, renovando o
+# TTL e a atividade no índice. Retorna {lado, 1 se reconexão} ou nil com a sala cheia.
+JOIN_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    redis.call('hset', KEYS[1], unpack(ARGV, 5))
+end
+redis.call('pexpire', KEYS[1], ARGV[2])
+redis.call('zadd', KEYS[2], ARGV[3], ARGV[4])
+local current = redis.call('hget', KEYS[1], 'player:' .. ARGV[1])
+if current then
+    return {current, 1}
+end
+local fields = redis.call('hgetall', KEYS[1])
+local count = 0
+local left_taken = false
+for i = 1, #fields, 2 do
+    if string.sub(fields[i], 1, 7) == 'player:' then
+        count = count + 1
+        if fields[i + 1] == 'left' then
+            left_taken = true
+        end
+    end
+end
+if count >= 2 then
+    return false
+end
+local side = 'left'
+if left_taken then
+    side = 'right'
+end
+redis.call('hset', KEYS[1], 'player:' .. ARGV[1], side)
+if redis.call('hexists', KEYS[1], 'initial:' .. ARGV[1]) == 0 then
+    redis.call('hset', KEYS[1], 'initial:' .. ARGV[1], redis.call('hincrby', KEYS[1], 'initial_count', 1))
+end
+return {side, 0}
+"""
+
+# Remove o jogador. Com ARGV[2] preenchido e um único jogador restante numa
+# partida em andamento, já marca o WO. Retorna {restantes, 1 se WO} ou nil.
+LEAVE_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return false
+end
+local removed = redis.call('hdel', KEYS[1], 'player:' .. ARGV[1])
+local count = 0
+for _, name in ipairs(redis.call('hkeys', KEYS[1])) do
+    if string.sub(name, 1, 7) == 'player:' then
+        count = count + 1
+    end
+end
+local walkover = 0
+if removed == 1 and count == 1 and ARGV[2] ~= '' then
+    local status = redis.call('hget', KEYS[1], 'status') or 'ongoing'
+    if status == 'ongoing' then
+        redis.call('hset', KEYS[1], 'status', 'paused', 'wo_pending', '1', 'wo_initiated_at', ARGV[2])
+        walkover = 1
+    end
+end
+return {count, walkover}
+"""
+
+# Troca o status somente se ele for o esperado. Retorna {1|0, status atual}.
+SET_STATUS_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return false
+end
+local status = redis.call('hget', KEYS[1], 'status') or 'ongoing'
+if status ~= ARGV[1] then
+    return {0, status}
+end
+redis.call('hset', KEYS[1], 'status', ARGV[2])
+return {1, ARGV[2]}
+"""
+
+# Grava pares campo/valor apenas se a partida ainda existir. O placar nunca
+# diminui, então um snapshot atrasado não desfaz um ponto já gravado.
+# Também renova o TTL do estado e dos canais e a atividade no índice.
+SAVE_FIELDS_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('pexpire', KEYS[1], ARGV[1])
+redis.call('pexpire', KEYS[2], ARGV[1])
+redis.call('zadd', KEYS[3], ARGV[2], ARGV[3])
+for i = 4, #ARGV, 2 do
+    local name = ARGV[i]
+    local value = ARGV[i + 1]
+    if string.sub(name, 1, 6) == 'score:' then
+        if tonumber(value) > tonumber(redis.call('hget', KEYS[1], name) or '0') then
+            redis.call('hset', KEYS[1], name, value)
+        end
+    else
+        redis.call('hset', KEYS[1], name, value)
+    end
+end
+return 1
+"""
+
+_scripts = {}
+
+
+def _prefix():
+    return settings.GAME_ENGINE["KEY_PREFIX"]
+
+
+def _ttl_ms():
+    return int(settings.GAME_ENGINE["STATE_TTL"] * 1000)
+
+
+def state_key(match_id):
+    return f"{_prefix()}:match:{match_id}"
+
+
+def owner_key(match_id):
+    return f"{state_key(match_id)}:owner"
+
+
+def channels_key(match_id):
+    return f"{state_key(match_id)}:channels"
+
+
+def active_key():
+    return f"{_prefix()}:matches"
+
+
+def engines_key():
+    return f"{_prefix()}:engines"
+
+
+def metrics_key(channel_name):
+    return f"{_prefix()}:metrics:{channel_name}"
+
+
+async def _run_script(source, keys, args):
+    redis_client = get_redis()
+    script = _scripts.get(source)
+    if script is None:
+        script = _scripts[source] = redis_client.register_script(source)
+    return await script(keys=keys, args=args, client=redis_client)
+
+
+async def load_state(match_id):
+    return MatchState.from_redis(await get_redis().hgetall(state_key(match_id)))
+
+
+async def join_match(match_id, user_id, tournament_id=None):
+    """
+    Reserva atomicamente um lado para o jogador. Retorna (lado, reconexão) ou None com a sala cheia.
+    """
+    initial = dict(INITIAL_FIELDS, tournament_id=tournament_id if tournament_id is not None else "")
+    args = [str(user_id), _ttl_ms(), time.time(), str(match_id)]
+    for name, value in initial.items():
+        args.extend((name, value))
+    result = await _run_script(JOIN_SCRIPT, [state_key(match_id), active_key()], args)
+    if not result:
+        return None
+    return result[0], bool(result[1])
+
+
+async def leave_match(match_id, user_id, walkover_at=None):
+    """
+    Remove o jogador da partida. Com `walkover_at`, marca o WO se restar só um jogador.
+    Retorna (jogadores restantes, WO marcado) ou None se a partida não existe.
+    """
+    result = await _run_script(LEAVE_SCRIPT, [state_key(match_id)], [str(user_id), walkover_at or ""])
+    if not result:
+        return None
+    return int(result[0]), bool(result[1])
+
+
+async def set_status(match_id, expected, status):
+    """
+    Altera o status se ele for `expected`. Retorna (alterado, status atual) ou None.
+    """
+    result = await _run_script(SET_STATUS_SCRIPT, [state_key(match_id)], [expected, status])
+    if not result:
+        return None
+    return bool(result[0]), result[1]
+
+
+async def save_fields(match_id, state, fields):
+    """
+    Grava os campos indicados do estado, se a partida ainda existir, e renova seu TTL.
+    """
+    args = [_ttl_ms(), time.time(), str(match_id)]
+    for name, value in state.to_redis(fields).items():
+        args.extend((name, value))
+    keys = [state_key(match_id), channels_key(match_id), active_key()]
+    return bool(await _run_script(SAVE_FIELDS_SCRIPT, keys, args))
+
+
+async def register_channel(match_id, user_id, channel_name):
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.hset(channels_key(match_id), str(user_id), channel_name)
+        pipe.pexpire(channels_key(match_id), _ttl_ms())
+        await pipe.execute()
+
+
+async def unregister_channel(match_id, user_id, channel_name):
+    """
+    Remove o canal do jogador, a menos que uma reconexão já o tenha substituído.
+    """
+    redis_client = get_redis()
+    if await redis_client.hget(channels_key(match_id), str(user_id)) == channel_name:
+        await redis_client.hdel(channels_key(match_id), str(user_id))
+
+
+async def get_channels(match_id):
+    return await get_redis().hgetall(channels_key(match_id))
+
+
+async def stale_matches(idle_seconds):
+    """
+    IDs das partidas sem atividade registrada há mais de `idle_seconds`.
+    """
+    return await get_redis().zrangebyscore(active_key(), "-inf", time.time() - idle_seconds)
+
+
+async def recent_matches(idle_seconds):
+    """
+    IDs das partidas com atividade nos últimos `idle_seconds`.
+    """
+    return await get_redis().zrangebyscore(active_key(), time.time() - idle_seconds, "+inf")
+
+
+async def heartbeat_engine(channel_name, ttl):
+    """
+    Registra o heartbeat do engine, descarta os que pararam de responder e
+    retorna os canais dos engines vivos.
+    """
+    now = time.time()
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.zadd(engines_key(), {channel_name: now})
+        pipe.zremrangebyscore(engines_key(), "-inf", now - ttl)
+        pipe.zrange(engines_key(), 0, -1)
+        results = await pipe.execute()
+    return results[-1]
+
+
+async def save_metrics(channel_name, snapshot, ttl):
+    await get_redis().set(metrics_key(channel_name), json.dumps(snapshot), px=int(ttl * 1000))
+
+
+async def load_metrics():
+    """
+    Snapshots de métricas dos engines vivos: {canal do engine: snapshot}.
+    """
+    redis_client = get_redis()
+    engines = await redis_client.zrange(engines_key(), 0, -1)
+    if not engines:
+        return {}
+    values = await redis_client.mget([metrics_key(channel_name) for channel_name in engines])
+    return {channel_name: json.loads(value) for channel_name, value in zip(engines, values) if value}
+
+
+async def forget_match(match_id):
+    await get_redis().zrem(active_key(), str(match_id))
+
+
+async def delete_match(match_id):
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.delete(state_key(match_id), channels_key(match_id))
+        pipe.zrem(active_key(), str(match_id))
+        await pipe.execute()
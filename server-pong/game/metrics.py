@@ -0,0 +1,193 @@
+import time
+
+# Instrumentação do engine e dos consumers de jogo, por processo.
+#
+# Cada engine publica periodicamente um snapshot no Redis (ver
+# match_store.save_metrics); o endpoint Prometheus e o comando
+# `engine_metrics` leem os snapshots de todos os workers.
+
+# Limites dos buckets (segundos ou bytes)
+TICK_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+OVERSHOOT_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BYTES_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+class Histogram:
+    """
+    Histograma com buckets fixos, no formato do Prometheus (contagem por limite, soma e total).
+    """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, limit in enumerate(self.buckets):
+            if value <= limit:
+                self.counts[index] += 1
+                break
+
+    def snapshot(self):
+        return {
+            "buckets": [[limit, count] for limit, count in zip(self.buckets, self.counts)],
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class GameMetrics:
+    """
+    Histogramas e contadores do loop das partidas, dos envios e das chamadas ao Redis.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.tick_seconds = Histogram(TICK_BUCKETS)  # trabalho de simulação por quadro
+        self.sleep_overshoot = Histogram(OVERSHOOT_BUCKETS)  # atraso do despertar em relação ao previsto
+        self.send_seconds = {}  # destino ("players", "spectators", "group") -> Histogram
+        self.redis_seconds = {}  # operação -> Histogram
+        self.payload_bytes = Histogram(BYTES_BUCKETS)  # tamanho das mensagens escritas no WebSocket
+        self.late_frames = 0  # quadros que precisaram de passos de recuperação
+        self.dropped_steps = 0  # passos descartados por estourar MAX_STEPS_PER_FRAME
+        self.messages = 0
+        self.errors = {}  # onde -> quantidade
+        self.spectators = 0  # espectadores conectados ao hub deste worker
+
+    def observe_send(self, target, seconds):
+        histogram = self.send_seconds.get(target)
+        if histogram is None:
+            histogram = self.send_seconds[target] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+    def observe_redis(self, operation, seconds):
+        histogram = self.redis_seconds.get(operation)
+        if histogram is None:
+            histogram = self.redis_seconds[operation] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+    def observe_payload(self, size):
+        self.messages += 1
+        self.payload_bytes.observe(size)
+
+    def record_frame(self, steps, work_seconds, dropped):
+        if steps:
+            self.tick_seconds.observe(work_seconds)
+        if steps > 1:
+            self.late_frames += 1
+        self.dropped_steps += dropped
+
+    def count_error(self, where):
+        self.errors[where] = self.errors.get(where, 0) + 1
+
+    def snapshot(self):
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "tick_seconds": self.tick_seconds.snapshot(),
+            "sleep_overshoot_seconds": self.sleep_overshoot.snapshot(),
+            "send_seconds": {target: histogram.snapshot() for target, histogram in self.send_seconds.items()},
+            "redis_seconds": {operation: histogram.snapshot() for operation, histogram in self.redis_seconds.items()},
+            "payload_bytes": self.payload_bytes.snapshot(),
+            "late_frames": self.late_frames,
+            "dropped_steps": self.dropped_steps,
+            "messages": self.messages,
+            "errors": dict(self.errors),
+            "spectators": self.spectators,
+        }
+
+
+game_metrics = GameMetrics()
+
+
+def histogram_quantile(histogram, q):
+    """
+    Limite superior do bucket que contém o quantil `q` de um snapshot de histograma.
+    """
+    if not histogram["count"]:
+        return None
+    target = q * histogram["count"]
+    cumulative = 0
+    for limit, count in histogram["buckets"]:
+        cumulative += count
+        if cumulative >= target:
+            return limit
+    return float("inf")
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+
+def _histogram_lines(name, histogram, **labels):
+    lines = []
+    cumulative = 0
+    for limit, count in histogram["buckets"]:
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=limit)} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram['count']}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram['sum']}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram['count']}")
+    return lines
+
+
+def render_prometheus(snapshots):
+    """
+    Formato texto do Prometheus para os snapshots {worker: snapshot} publicados pelos engines.
+    """
+    series = {
+        "pong_matches": ("gauge", "Partidas simuladas pelo worker."),
+        "pong_spectators": ("gauge", "Espectadores conectados ao worker."),
+        "pong_tick_seconds": ("histogram", "Tempo de simulação por quadro do loop."),
+        "pong_sleep_overshoot_seconds": ("histogram", "Atraso do despertar do loop em relação ao previsto."),
+        "pong_send_seconds": ("histogram", "Duração dos envios de mensagens das partidas."),
+        "pong_redis_seconds": ("histogram", "Duração das chamadas ao Redis feitas pelo engine."),
+        "pong_payload_bytes": ("histogram", "Tamanho das mensagens enviadas pelo WebSocket."),
+        "pong_late_frames_total": ("counter", "Quadros que precisaram de passos de recuperação."),
+        "pong_dropped_steps_total": ("counter", "Passos de simulação descartados por atraso."),
+        "pong_errors_total": ("counter", "Exceções tratadas no loop e nos envios."),
+        "pong_redis_pool_wait_seconds_max": ("gauge", "Maior espera por uma conexão do pool do Redis."),
+        "pong_redis_pool_timeouts_total": ("counter", "Esperas por conexão do pool que estouraram o timeout."),
+    }
+    lines = {name: [] for name in series}
+    for worker, snapshot in sorted(snapshots.items()):
+        metrics = snapshot["metrics"]
+        lines["pong_matches"].append(f"pong_matches{_labels(worker=worker)} {snapshot['matches']}")
+        lines["pong_spectators"].append(f"pong_spectators{_labels(worker=worker)} {metrics['spectators']}")
+        lines["pong_tick_seconds"] += _histogram_lines("pong_tick_seconds", metrics["tick_seconds"], worker=worker)
+        lines["pong_sleep_overshoot_seconds"] += _histogram_lines(
+            "pong_sleep_overshoot_seconds", metrics["sleep_overshoot_seconds"], worker=worker
+        )
+        for target, histogram in sorted(metrics["send_seconds"].items()):
+            lines["pong_send_seconds"] += _histogram_lines("pong_send_seconds", histogram, worker=worker, target=target)
+        for operation, histogram in sorted(metrics["redis_seconds"].items()):
+            lines["pong_redis_seconds"] += _histogram_lines(
+                "pong_redis_seconds", histogram, worker=worker, operation=operation
+            )
+        lines["pong_payload_bytes"] += _histogram_lines("pong_payload_bytes", metrics["payload_bytes"], worker=worker)
+        lines["pong_late_frames_total"].append(f"pong_late_frames_total{_labels(worker=worker)} {metrics['late_frames']}")
+        lines["pong_dropped_steps_total"].append(
+            f"pong_dropped_steps_total{_labels(worker=worker)} {metrics['dropped_steps']}"
+        )
+        for where, count in sorted(metrics["errors"].items()):
+            lines["pong_errors_total"].append(f"pong_errors_total{_labels(worker=worker, where=where)} {count}")
+        pool = snapshot["redis_pool"]
+        lines["pong_redis_pool_wait_seconds_max"].append(
+            f"pong_redis_pool_wait_seconds_max{_labels(worker=worker)} {pool['wait_max_seconds']}"
+        )
+        lines["pong_redis_pool_timeouts_total"].append(
+            f"pong_redis_pool_timeouts_total{_labels(worker=worker)} {pool['timeouts']}"
+        )
+
+    output = []
+    for name, (kind, description) in series.items():
+        output.append(f"# HELP {name} {description}")
+        output.append(f"# TYPE {name} {kind}")
+        output.extend(lines[name])
+    return "\n".join(output) + "\n"
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0016_remove_notification_match_remove_notification_player_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='replay',
+            field=models.FileField(blank=True, null=True, upload_to='replays/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0017_match_replay'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['player1', '-played_at', '-id'], name='match_player1_played_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['player2', '-played_at', '-id'], name='match_player2_played_idx'),
+        ),
+    ]
@@ -98,6 +98,15 @@ class Match(models.Model):
     last_updated = models.DateTimeField(auto_now=True)
     winner_id = models.IntegerField(null=True, blank=True)  # Campo adicionado
     last_tournament_match = models.BooleanField(default=False)  # Novo campo
+    replay = models.FileField(upload_to='replays/', null=True, blank=True)  # Log gravado pelo engine (game/replay.py)
+
+    class Meta:
+        indexes = [
+            # Histórico de partidas por jogador, paginado por (played_at, id) (game/match_history.py)
+            # na mesma ordem de cada trecho da consulta (played_at DESC, id DESC), sem Sort
+            models.Index(fields=['player1', '-played_at', '-id'], name='match_player1_played_idx'),
+            models.Index(fields=['player2', '-played_at', '-id'], name='match_player2_played_idx'),
+        ]
 
     def __str__(self):
         return f"Tournament Match {self.id}: {self.player1.username} vs {self.player2.username}"
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import struct
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .match_state import MatchState
+
+# Gravação das partidas para replay, em um log binário só de acréscimo.
+#
+# Layout (little-endian):
+#   cabeçalho  4s magic "PRPL", u8 versão, u16 tick_rate
+#   registros  u8 tipo + u32 tick, seguidos de:
+#     INPUT     u8 lado (0 = left, 1 = right), u8 direção (1 = up, 2 = down)     -> 7 bytes
+#     KEYFRAME  6 x f64 (ball_x, ball_y, ball_speed_x, ball_speed_y, paddle_left, paddle_right),
+#               u8 score_left, u8 score_right                                   -> 55 bytes
+#
+# Entre dois keyframes bastam as entradas: a reprodução refaz a simulação com
+# `step_ball`, no mesmo passo fixo da partida. Com um keyframe por segundo, um
+# minuto de jogo ocupa poucos KB.
+
+MAGIC = b"PRPL"
+VERSION = 1
+
+HEADER = struct.Struct("<4sBH")
+RECORD = struct.Struct("<BI")
+INPUT = struct.Struct("<BB")
+KEYFRAME = struct.Struct("<6dBB")
+
+RECORD_INPUT = 1
+RECORD_KEYFRAME = 2
+
+SIDES = ("left", "right")
+DIRECTIONS = {"up": 1, "down": 2}
+
+
+def replay_name(match_id):
+    """
+    Nome do arquivo relativo ao MEDIA_ROOT (o mesmo gravado em `Match.replay`).
+    """
+    return f"{settings.GAME_ENGINE['REPLAY_DIR']}/match_{match_id}.pong"
+
+
+class ReplayRecorder:
+    """
+    Acumula os registros de uma partida em memória. O engine chama `flush` nos
+    checkpoints; a escrita em disco é feita pelo ReplayWriter, fora do tick.
+    """
+    def __init__(self, match_id, tick_rate):
+        self.match_id = match_id
+        self.name = replay_name(match_id)
+        self.buffer = bytearray(HEADER.pack(MAGIC, VERSION, tick_rate))
+        self.header = True  # o cabeçalho só é escrito se o arquivo ainda não existir
+
+    def input(self, tick, side, direction):
+        code = DIRECTIONS.get(direction)
+        if code is None:
+            return
+        self.buffer += RECORD.pack(RECORD_INPUT, tick)
+        self.buffer += INPUT.pack(SIDES.index(side), code)
+
+    def keyframe(self, tick, state):
+        self.buffer += RECORD.pack(RECORD_KEYFRAME, tick)
+        self.buffer += KEYFRAME.pack(
+            state.ball_x, state.ball_y, state.ball_speed_x, state.ball_speed_y,
+            state.paddle_left, state.paddle_right,
+            min(state.score_left, 255), min(state.score_right, 255),
+        )
+
+    def flush(self, final=False):
+        if self.buffer or final:
+            replay_writer.enqueue(self, bytes(self.buffer), self.header, final)
+            self.buffer.clear()
+            self.header = False
+
+
+class ReplayWriter:
+    """
+    Fila única por processo com os trechos a acrescentar aos arquivos de
+    replay. Um task grava em uma thread e, no trecho final, associa o arquivo
+    à partida no banco.
+    """
+    def __init__(self):
+        self.queue = None
+        self.task = None
+        self.written = 0
+
+    def enqueue(self, recorder, data, header, final):
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        self.queue.put_nowait((recorder.match_id, recorder.name, data, header, final))
+
+    async def run(self):
+        while True:
+            match_id, name, data, header, final = await self.queue.get()
+            try:
+                self.written += await asyncio.to_thread(_append, name, data, header)
+                if final:
+                    # O ORM passa pelo database_sync_to_async, que fecha as conexões
+                    # antigas da thread; o to_thread fica só para o arquivo
+                    await database_sync_to_async(_attach, thread_sensitive=False)(match_id, name)
+            except Exception as e:
+                print(f"Erro ao gravar o replay da partida {match_id}: {e}")
+
+
+def _append(name, data, header):
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as replay_file:
+        # Partida retomada por outro engine continua o mesmo arquivo
+        if not header or replay_file.tell() == 0:
+            replay_file.write(data)
+            return len(data)
+        replay_file.write(data[HEADER.size:])
+        return len(data) - HEADER.size
+
+
+def _attach(match_id, name):
+    from .models import Match
+    Match.objects.filter(pk=match_id).update(replay=name)
+
+
+def read_records(data):
+    """
+    Decodifica o log: retorna (tick_rate, registros), cada registro sendo
+    ("input", tick, lado, direção) ou ("keyframe", tick, MatchState).
+    """
+    magic, version, tick_rate = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Arquivo de replay inválido.")
+
+    records = []
+    offset = HEADER.size
+    while offset + RECORD.size <= len(data):
+        kind, tick = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if kind == RECORD_INPUT:
+            if offset + INPUT.size > len(data):
+                break
+            side, code = INPUT.unpack_from(data, offset)
+            offset += INPUT.size
+            direction = "up" if code == 1 else "down"
+            records.append(("input", tick, SIDES[side], direction))
+        elif kind == RECORD_KEYFRAME:
+            if offset + KEYFRAME.size > len(data):
+                break
+            values = KEYFRAME.unpack_from(data, offset)
+            offset += KEYFRAME.size
+            state = MatchState(
+                ball_x=values[0], ball_y=values[1], ball_speed_x=values[2], ball_speed_y=values[3],
+                paddle_left=values[4], paddle_right=values[5], score_left=values[6], score_right=values[7],
+            )
+            records.append(("keyframe", tick, state))
+        else:
+            break  # trecho final incompleto ou corrompido
+    return tick_rate, records
+
+
+def replay_frames(tick_rate, records, frame_ticks=2):
+    """
+    Refaz a partida a partir dos registros. Gera (tick, estado) a cada
+    `frame_ticks` passos, mais um quadro em cada keyframe.
+    """
+    # Import tardio: o engine importa este módulo para gravar
+    from .match_engine import apply_input, step_ball
+
+    dt = 1 / tick_rate
+    state = None
+    tick = 0
+    for record in records:
+        target = record[1]
+        if state is not None and target > tick:
+            # Avança a simulação até o tick do registro
+            while tick < target:
+                step_ball(state, dt)
+                tick += 1
+                if tick % frame_ticks == 0:
+                    yield tick, state
+        if record[0] == "keyframe":
+            state, tick = record[2], target
+            yield tick, state
+        elif state is not None:
+            apply_input(state, record[2], record[3])
+
+
+replay_writer = ReplayWriter()
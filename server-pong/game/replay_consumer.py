@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from .replay import read_records, replay_frames, replay_name
+
+
+class ReplayConsumer(AsyncWebsocketConsumer):
+    """
+    Reproduz o replay gravado de uma partida, na velocidade pedida em ?speed=N.
+    As mensagens têm o mesmo formato do jogo ao vivo (state_update).
+    """
+    async def connect(self):
+        self.match_id = self.scope["url_route"]["kwargs"]["match_id"]
+        self.playback_task = None
+
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            print(f"Replay da partida {self.match_id} recusado: usuário não autenticado.")
+            await self.close()
+            return
+
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        try:
+            speed = float(query.get("speed", ["1"])[0])
+        except ValueError:
+            speed = 1.0
+        self.speed = min(max(speed, 0.25), settings.GAME_ENGINE["REPLAY_MAX_SPEED"])
+
+        data = await self.load_replay(self.match_id)
+        if not data:
+            print(f"Replay da partida {self.match_id} não encontrado.")
+            await self.close()
+            return
+
+        await self.accept()
+        self.playback_task = asyncio.create_task(self.play(data))
+
+    async def disconnect(self, close_code):
+        if self.playback_task is not None:
+            self.playback_task.cancel()
+
+    @database_sync_to_async
+    def load_replay(self, match_id):
+        """
+        Lê o arquivo associado à partida ou, se ela ainda não terminou, o que
+        já foi gravado no disco local.
+        """
+        from .models import Match
+        try:
+            match = Match.objects.get(pk=match_id)
+        except (Match.DoesNotExist, ValueError):
+            return None
+        if match.replay:
+            with match.replay.open("rb") as replay_file:
+                return replay_file.read()
+        path = os.path.join(settings.MEDIA_ROOT, replay_name(match_id))
+        if os.path.exists(path):
+            with open(path, "rb") as replay_file:
+                return replay_file.read()
+        return None
+
+    async def play(self, data):
+        try:
+            tick_rate, records = read_records(data)
+            frame_ticks = max(1, tick_rate // settings.GAME_ENGINE["BROADCAST_RATE"])
+            await self.send(json.dumps({
+                "type": "replay_start",
+                "state": {"tick_rate": tick_rate, "speed": self.speed},
+            }))
+
+            last_tick = None
+            for tick, state in replay_frames(tick_rate, records, frame_ticks):
+                # Ticks que voltam indicam a partida retomada por outro engine
+                if last_tick is not None and tick > last_tick:
+                    await asyncio.sleep((tick - last_tick) / tick_rate / self.speed)
+                last_tick = tick
+                await self.send(json.dumps({
+                    "type": "state_update",
+                    "state": dict(state.to_wire(), tick=tick),
+                }))
+
+            await self.send(json.dumps({"type": "replay_end", "state": {"tick": last_tick}}))
+            await self.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Erro ao reproduzir o replay da partida {self.match_id}: {e}")
+            await self.close()
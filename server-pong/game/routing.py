@@ -1,7 +1,13 @@
 from django.urls import re_path
 from .game_consumer import GameConsumer
+from .replay_consumer import ReplayConsumer
+from .spectator_consumer import SpectatorConsumer
 
 websocket_urlpatterns = [
     # Rota WebSocket para o jogo, identificada pelo match_id
     re_path(r"ws/game/(?P<match_id>\w+)/$", GameConsumer.as_asgi()),
+    # Espectadores da partida, com atraso opcional (?delay=N)
+    re_path(r"ws/game/(?P<match_id>\w+)/spectate/$", SpectatorConsumer.as_asgi()),
+    # Reprodução do replay gravado da partida (?speed=N)
+    re_path(r"ws/game/(?P<match_id>\w+)/replay/$", ReplayConsumer.as_asgi()),
 ]
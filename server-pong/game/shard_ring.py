@@ -0,0 +1,28 @@
+import bisect
+import hashlib
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Anel de hash consistente: cada nó (canal de um engine) ocupa `vnodes`
+    pontos do anel e uma chave pertence ao primeiro ponto depois do seu hash.
+    Quando um nó entra ou sai, só as chaves da vizinhança dele mudam de dono.
+    """
+    def __init__(self, nodes=(), vnodes=64):
+        self.nodes = frozenset(nodes)
+        points = sorted((_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._points = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node_for(self, key):
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(str(key))) % len(self._points)
+        return self._owners[index]
@@ -0,0 +1,24 @@
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .leaderboard import remove_user
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def remove_deleted_user_from_rankings(sender, instance, **kwargs):
+    """
+    Usuário excluído sai dos rankings do Redis assim que a exclusão é confirmada.
+    Sem isso, o id continuaria nos sorted sets (o rebuild só roda sem o marcador).
+    """
+    user_id = instance.pk
+
+    def remove():
+        try:
+            async_to_sync(remove_user)(user_id)
+        except Exception as e:
+            print(f"Erro ao remover o usuário {user_id} dos rankings: {e}")
+
+    transaction.on_commit(remove)
@@ -0,0 +1,57 @@
+import json
+from urllib.parse import parse_qs
+
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from .match_store import load_state
+from .spectators import spectator_hub
+
+
+class SpectatorConsumer(AsyncWebsocketConsumer):
+    """
+    Espectador de uma partida em andamento. Recebe o estado em SPECTATOR_RATE
+    quadros por segundo, com o atraso opcional pedido em ?delay=N (segundos).
+    Não ocupa vaga de jogador e não envia comandos ao engine.
+    """
+    async def connect(self):
+        self.match_id = self.scope["url_route"]["kwargs"]["match_id"]
+        self.joined = False
+
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            print(f"Espectador recusado na partida {self.match_id}: usuário não autenticado.")
+            await self.close()
+            return
+
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        try:
+            delay = float(query.get("delay", ["0"])[0])
+        except ValueError:
+            delay = 0.0
+        self.delay = min(max(delay, 0.0), settings.GAME_ENGINE["SPECTATOR_MAX_DELAY"])
+
+        game_state = await load_state(self.match_id)
+        if game_state is None:
+            print(f"Partida {self.match_id} não está em andamento. Fechando conexão do espectador.")
+            await self.close()
+            return
+
+        await self.accept()
+        await self.send(json.dumps({
+            "type": "spectating",
+            "state": {"delay": self.delay, "rate": settings.GAME_ENGINE["SPECTATOR_RATE"]},
+        }))
+        if not self.delay:
+            await self.send(json.dumps({"type": "state_update", "state": game_state.to_wire()}))
+
+        await spectator_hub.join(self.match_id, self, self.delay)
+        self.joined = True
+
+    async def disconnect(self, close_code):
+        if self.joined:
+            await spectator_hub.leave(self.match_id, self)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        # Espectadores só assistem
+        pass
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .match_engine import match_engine, spectator_group_name
+from .metrics import game_metrics
+
+# Espectadores ficam fora do caminho dos jogadores: o engine manda um único
+# group_send por quadro (em SPECTATOR_RATE) para o grupo de espectadores da
+# partida, cujos membros são os hubs (um por worker), e não cada espectador.
+# Cada hub serializa o quadro uma vez e o repassa aos seus consumers locais,
+# imediatamente ou com o atraso pedido por cada um.
+
+
+class MatchAudience:
+    """
+    Espectadores de uma partida neste worker e o histórico recente de mensagens.
+    """
+    def __init__(self):
+        self.viewers = {}  # consumer -> atraso em segundos
+        self.cursors = {}  # consumer -> número da última mensagem entregue
+        self.buffer = deque()  # (número, instante de chegada, texto)
+        self.next_number = 1
+
+
+class SpectatorHub:
+    """
+    Fan-out local das partidas assistidas neste worker.
+    """
+    def __init__(self):
+        self.channel_name = None
+        self.audiences = {}  # match_id -> MatchAudience
+        self.listener_task = None
+        self.pump_task = None
+        self.delivered = 0
+
+    def get_stats(self):
+        return {
+            "matches": len(self.audiences),
+            "viewers": sum(len(audience.viewers) for audience in self.audiences.values()),
+            "delivered": self.delivered,
+        }
+
+    async def ensure_started(self):
+        if self.listener_task is None or self.listener_task.done():
+            self.channel_name = await get_channel_layer().new_channel()
+            self.listener_task = asyncio.create_task(self.listen())
+            # Um canal novo precisa voltar aos grupos das partidas já assistidas
+            for match_id in self.audiences:
+                await self.subscribe(match_id)
+        if self.pump_task is None or self.pump_task.done():
+            self.pump_task = asyncio.create_task(self.pump())
+
+    async def subscribe(self, match_id):
+        await get_channel_layer().group_add(spectator_group_name(match_id), self.channel_name)
+        await match_engine.dispatch(match_id, {"action": "spectator_join", "hub": self.channel_name})
+
+    async def join(self, match_id, consumer, delay=0.0):
+        await self.ensure_started()
+        audience = self.audiences.get(match_id)
+        if audience is None:
+            audience = self.audiences[match_id] = MatchAudience()
+            await self.subscribe(match_id)
+        audience.viewers[consumer] = delay
+        game_metrics.spectators += 1
+        # Entra a partir do histórico já disponível para o seu atraso
+        audience.cursors[consumer] = 0 if delay else audience.next_number - 1
+
+    async def leave(self, match_id, consumer):
+        audience = self.audiences.get(match_id)
+        if audience is None:
+            return
+        if audience.viewers.pop(consumer, None) is not None:
+            game_metrics.spectators -= 1
+        audience.cursors.pop(consumer, None)
+        if not audience.viewers:
+            del self.audiences[match_id]
+            try:
+                await get_channel_layer().group_discard(spectator_group_name(match_id), self.channel_name)
+                await match_engine.dispatch(match_id, {"action": "spectator_leave", "hub": self.channel_name})
+            except Exception as e:
+                print(f"Erro ao sair do grupo de espectadores da partida {match_id}: {e}")
+
+    async def listen(self):
+        """
+        Recebe as mensagens do grupo de espectadores de todas as partidas assistidas.
+        """
+        channel_layer = get_channel_layer()
+        while True:
+            try:
+                message = await channel_layer.receive(self.channel_name)
+                await self.receive(message["match_id"], message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro no hub de espectadores: {e}")
+
+    async def receive(self, match_id, message):
+        audience = self.audiences.get(match_id)
+        if audience is None:
+            return
+        text = json.dumps({"type": message["message_type"], "state": message["state"]})
+        number = audience.next_number
+        audience.next_number += 1
+        audience.buffer.append((number, time.monotonic(), text))
+        for consumer, delay in list(audience.viewers.items()):
+            if not delay:
+                await self.deliver(audience, consumer, number, text)
+
+    async def deliver(self, audience, consumer, number, text):
+        audience.cursors[consumer] = number
+        try:
+            await consumer.send(text)
+            self.delivered += 1
+            game_metrics.observe_payload(len(text))
+        except Exception as e:
+            game_metrics.count_error("spectators")
+            print(f"Erro ao enviar quadro ao espectador: {e}")
+
+    async def pump(self):
+        """
+        Entrega as mensagens aos espectadores com atraso, descarta o histórico
+        que nenhum deles ainda precisa e renova o aviso aos engines.
+        """
+        interval = 1 / settings.GAME_ENGINE["SPECTATOR_RATE"]
+        heartbeat = settings.GAME_ENGINE["SPECTATOR_HEARTBEAT"]
+        next_heartbeat = time.monotonic() + heartbeat
+        while True:
+            try:
+                now = time.monotonic()
+                for match_id, audience in list(self.audiences.items()):
+                    for consumer, delay in list(audience.viewers.items()):
+                        if not delay:
+                            continue
+                        # Os números do histórico são contíguos: começa logo após o cursor
+                        first = audience.buffer[0][0] if audience.buffer else 0
+                        index = max(0, audience.cursors.get(consumer, 0) + 1 - first)
+                        while index < len(audience.buffer):
+                            number, arrived, text = audience.buffer[index]
+                            if arrived + delay > now:
+                                break
+                            await self.deliver(audience, consumer, number, text)
+                            index += 1
+
+                    oldest = now - max(audience.viewers.values(), default=0) - 1
+                    while audience.buffer and audience.buffer[0][1] < oldest:
+                        audience.buffer.popleft()
+
+                if now >= next_heartbeat:
+                    next_heartbeat = now + heartbeat
+                    # Partida retomada por outro engine também passa a enviar a este hub
+                    for match_id in list(self.audiences):
+                        await match_engine.dispatch(match_id, {"action": "spectator_join", "hub": self.channel_name})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erro ao entregar quadros aos espectadores: {e}")
+            await asyncio.sleep(interval)
+
+
+spectator_hub = SpectatorHub()
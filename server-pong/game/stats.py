@@ -0,0 +1,138 @@
+import redis
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from . import leaderboard
+from .leaderboard import MAX_LIMIT, MAX_WINDOW, WINS
+from .models import Tournament, TournamentParticipant
+
+# Contadores de estatísticas (vitórias, derrotas, pontos e vencedor de torneio).
+#
+# Cada atualização é um único UPDATE com expressões F(): o banco soma sobre o
+# valor atual da linha, sem ler o registro para o Python e gravar a linha
+# inteira de volta. Assim duas finalizações simultâneas não perdem incrementos.
+
+TOURNAMENT_WIN_POINTS = 3  # pontos do vencedor de uma partida de torneio
+
+
+def record_match_result(winner_id, loser_id):
+    """
+    +1 vitória para o vencedor e +1 derrota para o perdedor, num só UPDATE.
+    """
+    User = get_user_model()
+    return User.objects.filter(pk__in=[winner_id, loser_id]).update(
+        wins=F("wins") + Case(When(pk=winner_id, then=Value(1)), default=Value(0)),
+        losses=F("losses") + Case(When(pk=loser_id, then=Value(1)), default=Value(0)),
+    )
+
+
+def add_tournament_points(tournament_id, user_id, points=TOURNAMENT_WIN_POINTS):
+    """
+    Soma pontos a um participante do torneio. Retorna False se ele não participa.
+    """
+    updated = TournamentParticipant.objects.filter(
+        tournament_id=tournament_id, user_id=user_id
+    ).update(points=F("points") + points)
+    return bool(updated)
+
+
+def tournament_leader(tournament_id):
+    """
+    user_id do participante com mais pontos, ou None se o torneio não tem participantes.
+    """
+    return (
+        TournamentParticipant.objects.filter(tournament_id=tournament_id)
+        .order_by("-points")
+        .values_list("user_id", flat=True)
+        .first()
+    )
+
+
+def set_tournament_winner(tournament_id, winner_id, status=None):
+    """
+    Grava o vencedor (e, se informado, o status) do torneio sem regravar os demais campos.
+    """
+    fields = {"winner_id": winner_id, "updated_at": timezone.now()}
+    if status is not None:
+        fields["status"] = status
+    return bool(Tournament.objects.filter(pk=tournament_id).update(**fields))
+
+
+def _ranked(board):
+    """
+    (queryset de (id, pontuação) por usuário, campo do id, campo da pontuação).
+    Torneios vencidos são contados por vencedor; quem não venceu nenhum fica de fora.
+    """
+    if board == WINS:
+        return get_user_model().objects.values_list("id", "wins"), "id", "wins"
+    won = (
+        Tournament.objects.filter(winner_id__isnull=False)
+        .values("winner_id")
+        .annotate(won=Count("id"))
+        .values_list("winner_id", "won")
+    )
+    return won, "winner_id", "won"
+
+
+def rank_in_db(board, user_id, window=0):
+    """
+    Posição de um usuário direto no banco, sem montar o ranking inteiro:
+    1 + quantos têm pontuação maior (COUNT sobre o índice user_wins_idx, no
+    caso das vitórias) e até `window` vizinhos de cada lado por keyset.
+    Usado quando o ranking do Redis (game/leaderboard.py) não está disponível.
+    """
+    ranked, id_field, score_field = _ranked(board)
+    window = max(0, min(window, MAX_WINDOW))
+
+    if board == WINS:
+        score = get_user_model().objects.filter(id=user_id).values_list("wins", flat=True).first()
+        if score is None:
+            return None
+    else:
+        score = Tournament.objects.filter(winner_id=user_id).count()
+
+    def position(value):
+        return ranked.filter(**{f"{score_field}__gt": value}).count() + 1
+
+    tie = Q(**{score_field: score})
+    above = ranked.filter(Q(**{f"{score_field}__gt": score}) | (tie & Q(**{f"{id_field}__lt": user_id})))
+    below = ranked.filter(Q(**{f"{score_field}__lt": score}) | (tie & Q(**{f"{id_field}__gt": user_id})))
+    members = (
+        list(above.order_by(score_field, f"-{id_field}")[:window])[::-1]
+        + [(int(user_id), score)]
+        + list(below.order_by(f"-{score_field}", id_field)[:window])
+    )
+    positions = {value: position(value) for value in {value for _, value in members}}
+    neighbors = [
+        {"user_id": member_id, "score": value, "position": positions[value]}
+        for member_id, value in members
+    ]
+    return {"user_id": int(user_id), "score": score, "position": positions[score], "neighbors": neighbors}
+
+
+def top_in_db(board, limit=10):
+    """
+    Os `limit` primeiros do ranking direto no banco, no formato de
+    `leaderboard.top`: [{"user_id", "score", "position"}].
+    """
+    ranked, id_field, score_field = _ranked(board)
+    rows = ranked.order_by(f"-{score_field}", id_field)[:max(1, min(limit, MAX_LIMIT))]
+    entries = []
+    for index, (user_id, score) in enumerate(rows):
+        # Posição de competição: empatados ficam na posição do primeiro deles
+        position = entries[-1]["position"] if entries and entries[-1]["score"] == score else index + 1
+        entries.append({"user_id": user_id, "score": score, "position": position})
+    return entries
+
+
+def ranking_top(board, limit=10):
+    """
+    Top do ranking pelo Redis ou, se ele estiver indisponível, pelo banco.
+    """
+    try:
+        return async_to_sync(leaderboard.top)(board, limit)
+    except redis.RedisError as e:
+        print(f"Ranking do Redis indisponível, consultando o banco: {e}")
+        return top_in_db(board, limit)
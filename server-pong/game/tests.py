@@ -1,3 +1,353 @@
-from django.test import TestCase
+import asyncio
+import copy
+import random
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import fakeredis
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from setup.redis_pool import InstrumentedConnectionPool
+from . import match_engine as engine_module
+from . import match_history
+from .batch_physics import BatchSimulation
+from .match_engine import (
+    FIELD_HEIGHT, FIELD_WIDTH, LEFT_PADDLE_FACE, MatchEngine, apply_input, broadcast_payload, build_delta, step_ball,
+)
+from .match_finalizer import complete_match
+from .match_state import MatchState
+from .match_store import get_channels, join_match, leave_match, load_state, save_fields
+from .models import Match, Tournament, TournamentParticipant
+from .replay import SIDES, ReplayRecorder, read_records, replay_frames
+from .wire import FRAME_DELTA, STATE_FRAME, QUANT_MAX, apply_delta, encode_state_frame
+
+
+class FakeRedisMixin:
+    """
+    Cada teste usa um Redis em memória novo (fakeredis, com os scripts Lua),
+    compartilhado pelos pools de todos os event loops abertos no teste.
+    """
+    def setUp(self):
+        super().setUp()
+        server = fakeredis.FakeServer()
+
+        def build_pool():
+            return InstrumentedConnectionPool(
+                connection_class=fakeredis.aioredis.FakeConnection, server=server,
+                decode_responses=True, max_connections=10, timeout=5,
+            )
+
+        patcher = mock.patch("setup.redis_pool._build_pool", build_pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+def run(coroutine_function, *args):
+    return async_to_sync(coroutine_function)(*args)
+
+
+def random_state(rng, max_speed=900):
+    return MatchState(
+        ball_x=rng.uniform(LEFT_PADDLE_FACE, FIELD_WIDTH - LEFT_PADDLE_FACE),
+        ball_y=rng.uniform(0, FIELD_HEIGHT),
+        ball_speed_x=rng.choice([-1, 1]) * rng.uniform(100, max_speed),
+        ball_speed_y=rng.uniform(-max_speed / 2, max_speed / 2),
+        paddle_left=rng.uniform(0, 500),
+        paddle_right=rng.uniform(0, 500),
+    )
+
+
+class MatchStoreScriptTests(FakeRedisMixin, SimpleTestCase):
+    def test_concurrent_joins_take_each_side_once(self):
+        async def scenario():
+            return await asyncio.gather(*(join_match("m1", user_id) for user_id in range(1, 5)))
+
+        results = run(scenario)
+        sides = [result[0] for result in results if result is not None]
+        self.assertEqual(sorted(sides), ["left", "right"])
+        self.assertEqual(results.count(None), 2)
+
+    def test_reconnect_keeps_the_side(self):
+        async def scenario():
+            await join_match("m1", 1)
+            await join_match("m1", 2)
+            return await join_match("m1", 1), await join_match("m1", 3)
+
+        rejoined, third = run(scenario)
+        self.assertEqual(rejoined, ("left", True))
+        self.assertIsNone(third)
+
+    def test_leave_marks_walkover_when_one_player_remains(self):
+        async def scenario():
+            await join_match("m1", 1)
+            await join_match("m1", 2)
+            left = await leave_match("m1", 1, "2026-01-01T00:00:00")
+            return left, await load_state("m1")
+
+        left, state = run(scenario)
+        self.assertEqual(left, (1, True))
+        self.assertEqual(state.status, "paused")
+        self.assertTrue(state.wo_pending)
+        self.assertEqual(state.players, {"2": "right"})
+
+    def test_leave_without_walkover_time_only_removes_the_player(self):
+        async def scenario():
+            await join_match("m1", 1)
+            await join_match("m1", 2)
+            return await leave_match("m1", 1), await leave_match("missing", 1)
+
+        left, missing = run(scenario)
+        self.assertEqual(left, (1, False))
+        self.assertIsNone(missing)
+
+    def test_scores_never_decrease(self):
+        async def scenario():
+            await join_match("m1", 1)
+            await save_fields("m1", MatchState(score_left=3, score_right=1), ("scores",))
+            # Snapshot atrasado, com o placar anterior
+            await save_fields("m1", MatchState(score_left=2, score_right=2), ("scores",))
+            return await load_state("m1")
+
+        state = run(scenario)
+        self.assertEqual((state.score_left, state.score_right), (3, 2))
+
+
+class MatchEngineStartTests(FakeRedisMixin, SimpleTestCase):
+    def test_commands_during_start_are_not_lost(self):
+        engine = MatchEngine()
+        engine.channel_name = "engine.test"
+        started = []
+
+        async def no_listener():
+            pass
+
+        async def fake_run(live):
+            started.append(dict(live.state.players))
+
+        async def scenario():
+            loading, loaded = asyncio.Event(), asyncio.Event()
+
+            async def slow_channels(match_id):
+                loading.set()
+                await loaded.wait()
+                return await get_channels(match_id)
+
+            await join_match("m1", 1)
+            with mock.patch.object(engine_module, "get_channels", slow_channels):
+                starting = asyncio.create_task(engine.start_match("m1"))
+                # Estado já lido, canais ainda não: o segundo jogador entra e já se move
+                await loading.wait()
+                await join_match("m1", 2)
+                joined = await engine.dispatch("m1", {"action": "join", "user_id": "2", "side": "right"})
+                moved = await engine.dispatch("m1", {"action": "move", "side": "left", "direction": "up", "seq": 1})
+                loaded.set()
+                await starting
+            await asyncio.sleep(0)
+            return joined, moved
+
+        with mock.patch.object(engine, "ensure_listener", no_listener), mock.patch.object(engine, "run", fake_run):
+            joined, moved = run(scenario)
+
+        self.assertTrue(joined and moved)
+        live = engine.matches["m1"]
+        self.assertEqual(live.state.players, {"1": "left", "2": "right"})
+        self.assertEqual(list(live.inputs["left"]), [("up", 1)])
+        self.assertEqual(started, [{"1": "left", "2": "right"}])
+        self.assertEqual(engine.starting, {})
+
+
+class PhysicsTests(SimpleTestCase):
+    def test_fast_ball_does_not_tunnel_through_the_paddle(self):
+        # Em um passo de 0,1 s a bola andaria 150 px, atravessando a raquete
+        state = MatchState(ball_x=100, ball_y=350, ball_speed_x=-1500, ball_speed_y=0, paddle_left=300)
+        step_ball(state, 0.1)
+        self.assertGreater(state.ball_speed_x, 0)
+        self.assertGreaterEqual(state.ball_x, LEFT_PADDLE_FACE)
+        self.assertEqual(state.score_right, 0)
+
+    def test_ball_stays_inside_the_field(self):
+        rng = random.Random(2)
+        states = [random_state(rng, max_speed=4000) for _ in range(100)]
+        for _ in range(300):
+            for state in states:
+                step_ball(state, 0.1)
+                self.assertTrue(0 <= state.ball_y <= FIELD_HEIGHT)
+
+    def test_batch_simulation_matches_step_ball(self):
+        rng = random.Random(1)
+        simulation = BatchSimulation(capacity=4)
+        states = {}
+        for index in range(50):
+            states[index] = random_state(rng, max_speed=3000)
+            simulation.add(index, states[index])
+            simulation.set_active(index, index % 7 != 0)
+
+        for _ in range(1000):
+            for index, state in states.items():
+                if index % 7:
+                    step_ball(state, 1 / 60)
+            simulation.step(1 / 60)
+
+        for index, state in states.items():
+            batched = copy.copy(state)
+            simulation.store(index, batched)
+            for name in ("ball_x", "ball_y", "ball_speed_x", "ball_speed_y"):
+                self.assertAlmostEqual(getattr(batched, name), getattr(state, name), places=6)
+            self.assertEqual((batched.score_left, batched.score_right), (state.score_left, state.score_right))
+
+
+class WireTests(SimpleTestCase):
+    def test_state_frame_round_trip(self):
+        state = dict(
+            broadcast_payload(MatchState(ball_x=200, ball_y=450, paddle_left=120, score_left=3, score_right=4), 77),
+            seq=12, acks={"left": 5, "right": 2 ** 32 + 1},
+        )
+        kind, seq, tick, ball_x, ball_y, paddle_left, paddle_right, score_left, score_right, ack_left, ack_right = (
+            STATE_FRAME.unpack(encode_state_frame(state, FRAME_DELTA))
+        )
+        self.assertEqual((kind, seq, tick), (FRAME_DELTA, 12, 77))
+        self.assertAlmostEqual(ball_x / QUANT_MAX * FIELD_WIDTH, 200, delta=0.01)
+        self.assertAlmostEqual(ball_y / QUANT_MAX * FIELD_HEIGHT, 450, delta=0.01)
+        self.assertAlmostEqual(paddle_left / QUANT_MAX * FIELD_HEIGHT, 120, delta=0.01)
+        self.assertAlmostEqual(paddle_right / QUANT_MAX * FIELD_HEIGHT, 300, delta=0.01)
+        self.assertEqual((score_left, score_right), (3, 4))
+        self.assertEqual((ack_left, ack_right), (5, 1))
+
+    def test_delta_applied_to_previous_state_rebuilds_the_current_one(self):
+        state = MatchState(ball_speed_x=300, ball_speed_y=100)
+        previous = broadcast_payload(state, 1, {"left": 0, "right": 0})
+        apply_input(state, "left", "up")
+        step_ball(state, 1 / 60)
+        current = broadcast_payload(state, 2, {"left": 1, "right": 0})
+
+        delta = build_delta(previous, current)
+        self.assertNotIn("players", delta)
+        self.assertEqual(apply_delta(previous, delta), current)
+
+    def test_delta_is_refused_when_other_fields_change(self):
+        state = MatchState()
+        previous = broadcast_payload(state, 1)
+        state.status = "paused"
+        self.assertIsNone(build_delta(previous, broadcast_payload(state, 2)))
+
+
+class ReplayTests(SimpleTestCase):
+    def test_replay_frames_reproduce_the_recorded_match(self):
+        rng = random.Random(3)
+        state = random_state(rng)
+        recorder = ReplayRecorder(1, 60)
+        recorder.keyframe(0, state)
+        # Mesma ordem do engine: as entradas do tick são aplicadas antes do passo
+        for tick in range(300):
+            if tick and tick % 7 == 0:
+                side, direction = rng.choice(SIDES), rng.choice(["up", "down"])
+                recorder.input(tick, side, direction)
+                apply_input(state, side, direction)
+            step_ball(state, 1 / 60)
+        recorder.keyframe(300, state)
+
+        tick_rate, records = read_records(bytes(recorder.buffer))
+        self.assertEqual(tick_rate, 60)
+        self.assertEqual([record[0] for record in records].count("input"), 299 // 7)
+
+        # O primeiro quadro do tick 300 é o simulado; o segundo, o keyframe gravado
+        simulated = next(
+            copy.copy(frame) for tick, frame in replay_frames(tick_rate, records, frame_ticks=1) if tick == 300
+        )
+        recorded = records[-1][2]
+        self.assertEqual(simulated, recorded)
+
+    def test_truncated_tail_is_ignored(self):
+        recorder = ReplayRecorder(1, 60)
+        recorder.keyframe(0, MatchState())
+        recorder.input(3, "left", "up")
+        _, records = read_records(bytes(recorder.buffer)[:-1])
+        self.assertEqual([record[0] for record in records], ["keyframe"])
+
+
+class CompleteMatchTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.player1 = User.objects.create(email="p1@example.com", display_name="P1")
+        self.player2 = User.objects.create(email="p2@example.com", display_name="P2")
+
+    def test_second_completion_is_ignored(self):
+        match = Match.objects.create(player1=self.player1, player2=self.player2, status="ongoing")
+
+        completed = complete_match(match.id, self.player1.id, (5, 2))
+        again = complete_match(match.id, self.player2.id, (2, 5))
+
+        self.assertEqual(completed.winner_id, self.player1.id)
+        self.assertIsNone(again)
+        self.player1.refresh_from_db()
+        self.player2.refresh_from_db()
+        self.assertEqual((self.player1.wins, self.player1.losses), (1, 0))
+        self.assertEqual((self.player2.wins, self.player2.losses), (0, 1))
+        match.refresh_from_db()
+        self.assertEqual((match.status, match.score_player1, match.score_player2), ("completed", 5, 2))
+
+    def test_last_tournament_match_reports_the_previous_winner(self):
+        tournament = Tournament.objects.create(
+            name="T", created_by=self.player1, status="ongoing", winner=self.player2,
+        )
+        TournamentParticipant.objects.create(tournament=tournament, user=self.player1, alias="a", points=3)
+        TournamentParticipant.objects.create(tournament=tournament, user=self.player2, alias="b", points=0)
+        match = Match.objects.create(
+            tournament=tournament, player1=self.player1, player2=self.player2,
+            status="ongoing", last_tournament_match=True,
+        )
+
+        completed = complete_match(match.id, self.player1.id, by_wo=True)
+
+        self.assertEqual(completed.previous_tournament_winner_id, self.player2.id)
+        self.assertEqual(completed.tournament_winner_id, self.player1.id)
+        self.assertEqual((completed.score_player1, completed.score_player2), (1, 0))
+        tournament.refresh_from_db()
+        self.assertEqual((tournament.status, tournament.winner_id), ("completed", self.player1.id))
+
+
+class MatchHistoryTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create(email="h@example.com", display_name="H")
+        self.opponent = User.objects.create(email="o@example.com", display_name="O")
+        now = timezone.now()
+        played = [now - timedelta(hours=hours) for hours in (1, 2, 2, 2, 5)]
+        for index, played_at in enumerate(played + [None, None, None]):
+            # Alterna os lados para a paginação intercalar as duas consultas
+            players = (self.user, self.opponent) if index % 2 else (self.opponent, self.user)
+            Match.objects.create(player1=players[0], player2=players[1], played_at=played_at)
+
+    def test_cursor_round_trip(self):
+        match = Match.objects.filter(played_at__isnull=False).first()
+        cursor = match_history.encode_cursor(match)
+        self.assertEqual(match_history.decode_cursor(cursor), (match.played_at, match.id))
+
+        unplayed = Match.objects.filter(played_at__isnull=True).first()
+        self.assertEqual(match_history.decode_cursor(match_history.encode_cursor(unplayed)), (None, unplayed.id))
+
+    def test_invalid_cursor(self):
+        for cursor in ("zzz", "", "WzFd"):  # "WzFd" = [1]
+            with self.assertRaises(match_history.InvalidCursor):
+                match_history.decode_cursor(cursor)
+
+    def test_pages_cover_the_history_in_order_including_the_null_tail(self):
+        expected = list(match_history.history_queryset(self.user).values_list("id", flat=True))
+        self.assertEqual(len(expected), 8)
+
+        for limit in (1, 2, 3, 8):
+            seen, cursor = [], None
+            while True:
+                page, cursor = match_history.history_page(self.user, cursor=cursor, limit=limit)
+                self.assertLessEqual(len(page), limit)
+                seen += [match.id for match in page]
+                if cursor is None:
+                    break
+            self.assertEqual(seen, expected)
+
+        # Partidas sem played_at vêm por último, da mais nova para a mais antiga
+        tail = Match.objects.filter(played_at__isnull=True).order_by("-id").values_list("id", flat=True)
+        self.assertEqual(expected[-3:], list(tail))
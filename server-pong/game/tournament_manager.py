@@ -1,10 +1,12 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 from django.db import transaction
 from django.utils import timezone
-from game.models import Tournament, Match, TournamentParticipant
+from game.models import Tournament, Match
+from game.leaderboard import record_tournament_win
+from game.stats import set_tournament_winner, tournament_leader
 
 class TournamentManagerConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -31,65 +33,75 @@ class TournamentManagerConsumer(AsyncWebsocketConsumer):
     async def advance_tournament(self, tournament_id):
         # Função centralizada para avançar para a próxima partida
         channel_layer = get_channel_layer()
+        tournament, next_match_id, previous_winner_id, winner_id = await self.start_next_match(tournament_id)
+
+        if next_match_id is not None:
+            # Envia mensagem de início para o grupo da próxima partida
+            await channel_layer.group_send(
+                f"match_{next_match_id}",
+                {
+                    "type": "game_start",
+                    "message": "A próxima partida do torneio foi iniciada automaticamente.",
+                    "match_id": next_match_id,
+                },
+            )
+            # Notifica também o grupo global do torneio para atualizar a tabela
+            await channel_layer.group_send(
+                self.room_group_name,
+                {
+                    "type": "tournament_update",
+                    "tournament": {
+                        "id": tournament.id,
+                        "name": tournament.name,
+                        "status": tournament.status,
+                        "next_match_id": next_match_id,
+                    },
+                },
+            )
+            print(f"Iniciando partida {next_match_id} para o torneio {tournament_id}.")
+            return
+
+        # Sem partidas pendentes: o torneio foi finalizado. O ranking só muda se
+        # o vencedor mudou (complete_match ou a API podem já tê-lo creditado).
+        if winner_id != previous_winner_id:
+            try:
+                await record_tournament_win(winner_id, previous_winner_id)
+            except Exception as e:
+                print(f"Erro ao atualizar o ranking com o torneio {tournament_id}: {e}")
+        await channel_layer.group_send(
+            self.room_group_name,
+            {
+                "type": "tournament_update",
+                "tournament": {
+                    "id": tournament.id,
+                    "name": tournament.name,
+                    "status": "completed",
+                    "message": f"O torneio '{tournament.name}' foi finalizado.",
+                },
+            },
+        )
+        print(f"Torneio {tournament_id} finalizado.")
+
+    @database_sync_to_async
+    def start_next_match(self, tournament_id):
+        """
+        Inicia a próxima partida pendente ou, se não houver, finaliza o torneio.
+        Retorna (torneio, id da próxima partida ou None, vencedor anterior, vencedor).
+        """
         # Bloco atômico para evitar condições de corrida
-        from django.db import transaction
         with transaction.atomic():
             tournament = Tournament.objects.select_for_update().get(id=tournament_id)
-            pending_matches = Match.objects.filter(tournament_id=tournament_id, status='pending').order_by('id')
-            if pending_matches.exists():
-                next_match = pending_matches.first()
+            previous_winner_id = tournament.winner_id
+            next_match = Match.objects.filter(tournament_id=tournament_id, status='pending').order_by('id').first()
+            if next_match is not None:
                 next_match.status = 'ongoing'
                 next_match.last_updated = timezone.now()
                 next_match.save()
+                return tournament, next_match.id, previous_winner_id, previous_winner_id
 
-                # Envia mensagem de início para o grupo da próxima partida
-                async_to_sync(channel_layer.group_send)(
-                    f"match_{next_match.id}",
-                    {
-                        "type": "game_start",
-                        "message": "A próxima partida do torneio foi iniciada automaticamente.",
-                        "match_id": next_match.id,
-                    },
-                )
-                # Notifica também o grupo global do torneio para atualizar a tabela
-                async_to_sync(channel_layer.group_send)(
-                    self.room_group_name,
-                    {
-                        "type": "tournament_update",
-                        "tournament": {
-                            "id": tournament.id,
-                            "name": tournament.name,
-                            "status": tournament.status,
-                            "next_match_id": next_match.id,
-                        },
-                    },
-                )
-                print(f"Iniciando partida {next_match.id} para o torneio {tournament_id}.")
-            else:
-                # Se não houver partidas pendentes, finaliza o torneio
-                tournament.status = 'completed'
-                tournament.winner_id = self.determine_tournament_winner(tournament_id)
-                tournament.save()
-                async_to_sync(channel_layer.group_send)(
-                    self.room_group_name,
-                    {
-                        "type": "tournament_update",
-                        "tournament": {
-                            "id": tournament.id,
-                            "name": tournament.name,
-                            "status": "completed",
-                            "message": f"O torneio '{tournament.name}' foi finalizado.",
-                        },
-                    },
-                )
-                print(f"Torneio {tournament_id} finalizado.")
-
-    def determine_tournament_winner(self, tournament_id):
-        participants = TournamentParticipant.objects.filter(tournament_id=tournament_id)
-        if participants.exists():
-            winner = max(participants, key=lambda p: p.points)
-            return winner.user_id
-        return None
+            winner_id = tournament_leader(tournament_id)
+            set_tournament_winner(tournament_id, winner_id, status='completed')
+            return tournament, None, previous_winner_id, winner_id
 
     async def tournament_update(self, event):
         # Encaminha a atualização para os clientes conectados
@@ -1,7 +1,10 @@
 from django.urls import path
 from .views import (
+    PositionAtRankingToUserProfile,
     MatchHistoryAPIView,
+    MatchHistoryExportAPIView,
     TournamentRankingAPIView,
+    LeaderboardRankAPIView,
     TournamentListAPIView,
     TournamentDetailAPIView,
     TournamentCreateAPIView,
@@ -16,12 +19,19 @@ from .views import (
     OngoingMatchAPIView,
     TournamentMatchesAPIView,
     TournamentNextMatchAPIView,
+    RedisPoolStatsAPIView,
+    EngineStatsAPIView,
+    PrometheusMetricsAPIView,
 )
 
 urlpatterns = [
     # Rankings e histórico de partidas
     path('match-history/<int:user_id>/', MatchHistoryAPIView.as_view(), name='match-history'),
+    path('match-history/<int:user_id>/export/', MatchHistoryExportAPIView.as_view(), name='match-history-export'),
     path('ranking/tournaments/', TournamentRankingAPIView.as_view(), name='tournament-ranking'),
+    path('ranking/<str:board>/users/<int:user_id>/', LeaderboardRankAPIView.as_view(), name='leaderboard-rank'),
+    path('ranking/position/', PositionAtRankingToUserProfile.as_view(), name='ranking-position'),
+    path('ranking/position/<int:user_id>/', PositionAtRankingToUserProfile.as_view(), name='ranking-position-user'),
 
     # Endpoints relacionados a partidas 1vs1 e torneios
     path('tournaments/', TournamentListAPIView.as_view(), name='tournament-list'),
@@ -40,4 +50,9 @@ urlpatterns = [
     path('match/<int:pk>/walkover/', MatchFinalizeAPIView.as_view(), name='match-walkover'),
     path('match/ongoing/', OngoingMatchAPIView.as_view(), name='ongoing-match'),
     path('tournament/next-match/', TournamentNextMatchAPIView.as_view(), name='tournament_next_match'),
+
+    # Métricas internas do worker
+    path('metrics/redis-pool/', RedisPoolStatsAPIView.as_view(), name='redis-pool-stats'),
+    path('metrics/engine/', EngineStatsAPIView.as_view(), name='engine-stats'),
+    path('metrics/prometheus/', PrometheusMetricsAPIView.as_view(), name='prometheus-metrics'),
 ]
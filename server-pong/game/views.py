@@ -1,11 +1,15 @@
-from django.db import models, IntegrityError, transaction
-from django.db.models import Count, Q, F
+import json
+
+from django.db import IntegrityError
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.http import HttpResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework import status
 
 from .models import Match, Tournament, TournamentParticipant
@@ -18,31 +22,96 @@ from .serializers import (
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync, sync_to_async
 
+from setup.redis_pool import get_pool_stats
+from .match_engine import match_engine
+from .spectators import spectator_hub
+from .match_store import load_metrics
+from .match_finalizer import complete_match
+from .stats import rank_in_db, ranking_top, set_tournament_winner
+from . import leaderboard, match_history
+from .metrics import render_prometheus
+
+async def engine_stats():
+    return dict(match_engine.get_stats(), spectators=spectator_hub.get_stats())
+
+def user_rank(board, user, window=0):
+    """
+    Posição do usuário no ranking pelo Redis (game/leaderboard.py) ou, se ele
+    falhar, contando no banco quantos têm pontuação maior (stats.rank_in_db).
+    """
+    try:
+        # Fora do ranking (nenhum torneio vencido ou usuário criado após o rebuild)
+        score = user.wins if board == leaderboard.WINS else 0
+        return async_to_sync(leaderboard.rank)(board, user.id, window, score)
+    except Exception as e:
+        print(f"Ranking do Redis indisponível, consultando o banco: {e}")
+        return rank_in_db(board, user.id, window)
+
 class PositionAtRankingToUserProfile(APIView):
+    """
+    Posição de um usuário no ranking, para o perfil, e até ?window=N vizinhos
+    de cada lado. ?by=tournaments (padrão) ou ?by=wins.
+
+    O ranking inteiro nunca é montado: ver `user_rank`.
+    """
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
+    def get(self, request, user_id=None):
         User = get_user_model()  # Obtenha o modelo de usuário configurado
+        board = request.query_params.get("by", leaderboard.TOURNAMENTS)
+        if board not in leaderboard.BOARDS:
+            return Response({"error": "Ranking inválido."}, status=400)
+        try:
+            window = int(request.query_params.get("window", 0))
+        except ValueError:
+            return Response({"error": "window inválido."}, status=400)
 
-        # Calcule o número de torneios vencidos por cada usuário
-        ranking = User.objects.annotate(
-            total_tournaments_won=Count('tournaments_created', filter=Q(tournaments_created__winner_id=F('id')))
-        ).order_by('-total_tournaments_won')
+        user = request.user if user_id is None else User.objects.filter(id=user_id).first()
+        if user is None:
+            return Response({"error": "Usuário não encontrado."}, status=404)
 
-        # Prepare a resposta
-        data = [
+        result = user_rank(board, user, window)
+        score_name = "wins" if board == leaderboard.WINS else "tournaments_won"
+        users = User.objects.in_bulk([entry["user_id"] for entry in result["neighbors"]])
+        neighbors = [
             {
-                "id": user.id,
-                "name": user.email,  # Substituído por email
-                "tournaments_won": user.total_tournaments_won,
-                "position": index + 1
+                "id": entry["user_id"],
+                "name": users[entry["user_id"]].email if entry["user_id"] in users else None,
+                score_name: entry["score"],
+                "position": entry["position"],
             }
-            for index, user in enumerate(ranking)
+            for entry in result["neighbors"]
         ]
-
-        return Response(data)
+        return Response({
+            "id": user.id,
+            "name": user.email,
+            score_name: result["score"],
+            "position": result["position"],
+            "neighbors": neighbors,
+        })
+
+def _history_params(request):
+    """
+    Filtros do histórico: ?tournament=<id>, ?result=win|loss|unplayed, ?opponent=<id>.
+    """
+    params = {}
+    for name, key in (("tournament", "tournament_id"), ("opponent", "opponent_id")):
+        value = request.query_params.get(name)
+        if value is not None:
+            params[key] = int(value)
+    result = request.query_params.get("result")
+    if result is not None:
+        if result not in match_history.RESULTS:
+            raise ValueError(f"result deve ser um de {', '.join(match_history.RESULTS)}.")
+        params["result"] = result
+    return params
 
 class MatchHistoryAPIView(APIView):
+    """
+    Histórico de partidas do usuário, do mais recente para o mais antigo,
+    paginado por cursor: ?cursor=<next_cursor da página anterior>&limit=N,
+    mais os filtros de `_history_params`.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, user_id):
@@ -52,68 +121,111 @@ class MatchHistoryAPIView(APIView):
         except User.DoesNotExist:
             return Response({"error": "Usuário não encontrado."}, status=404)
 
-        matches = Match.objects.filter(
-            models.Q(player1=user) | models.Q(player2=user)
-        ).select_related("tournament", "player1", "player2")
-
-        match_history = []
-        for match in matches:
-            # Determina o adversário: se o usuário é player1, o adversário é player2, e vice-versa.
-            opponent = match.player2 if match.player1 == user else match.player1
+        try:
+            params = _history_params(request)
+            limit = int(request.query_params.get("limit", match_history.DEFAULT_PAGE_SIZE))
+            matches, next_cursor = match_history.history_page(
+                user, request.query_params.get("cursor"), limit, **params
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
 
-            # Define o resultado usando winner_id:
-            if match.winner_id is not None:
-                result = "Vitória" if match.winner_id == user.id else "Derrota"
-            else:
-                result = "Não disputada"
+        return Response({
+            "results": [match_history.history_entry(match, user) for match in matches],
+            "next_cursor": next_cursor,
+        })
 
-            match_history.append({
-                "id": match.id,
-                "date": match.played_at,  # Usamos played_at para representar a data da partida
-                "opponent_display_name": opponent.display_name,
-                "opponent_alias": getattr(opponent, "alias", None),
-                "result": result,
-                "score": {
-                    "player1": match.score_player1 if match.score_player1 is not None else "-",
-                    "player2": match.score_player2 if match.score_player2 is not None else "-",
-                },
-                "tournament_name": match.tournament.name if match.tournament else None,
-            })
+class MatchHistoryExportAPIView(APIView):
+    """
+    Histórico completo do usuário em NDJSON (uma partida por linha), enviado
+    aos poucos enquanto as linhas são lidas do banco. Aceita os mesmos filtros
+    do histórico paginado.
+    """
+    permission_classes = [IsAuthenticated]
 
-        return Response(match_history)
+    def get(self, request, user_id):
+        User = get_user_model()
+        try:
+            user = User.objects.get(id=user_id)
+        except User.DoesNotExist:
+            return Response({"error": "Usuário não encontrado."}, status=404)
+        try:
+            params = _history_params(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        matches = match_history.history_queryset(user, **params).iterator(chunk_size=500)
+        lines = (
+            json.dumps(match_history.history_entry(match, user), cls=DjangoJSONEncoder) + "\n"
+            for match in matches
+        )
+        response = StreamingHttpResponse(lines, content_type="application/x-ndjson")
+        response["Content-Disposition"] = f'attachment; filename="match-history-{user.id}.ndjson"'
+        return response
 
 class TournamentRankingAPIView(APIView):
+    """
+    Ranking de torneios vencidos, lido do sorted set do Redis (game/leaderboard.py)
+    ou, com o Redis indisponível, do banco.
+    Aceita ?limit=N (padrão e máximo: leaderboard.MAX_LIMIT).
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         User = get_user_model()
+        try:
+            limit = int(request.query_params.get("limit", leaderboard.MAX_LIMIT))
+        except ValueError:
+            return Response({"error": "limit inválido."}, status=400)
 
-        # Agrupa por winner_id e conta o número de torneios vencidos por cada usuário
-        winners = (
-            Tournament.objects.values('winner_id')
-            .annotate(tournaments_won=Count('id'))  # Conta o número de torneios vencidos
-            .filter(winner_id__isnull=False)  # Ignora torneios sem vencedor
-            .order_by('-tournaments_won')  # Ordena pelo número de vitórias
-        )
+        entries = ranking_top(leaderboard.TOURNAMENTS, limit)
+        # Uma única consulta para os dados de todos os usuários do ranking
+        users = User.objects.in_bulk([entry["user_id"] for entry in entries])
 
-        # Busca os detalhes do usuário baseado no winner_id
         user_data = []
-        for index, winner in enumerate(winners):
-            try:
-                user = User.objects.get(id=winner['winner_id'])
-                user_data.append({
-                    "id": user.id,
-                    "display_name": user.display_name or user.email,  # Mostra o display_name ou email como fallback
-                    "avatar": user.avatar.url if user.avatar else None,
-                    "tournaments_won": winner['tournaments_won'],  # Total de torneios vencidos
-                    "position": index + 1  # Posição no ranking
-                })
-            except User.DoesNotExist:
+        for entry in entries:
+            user = users.get(entry["user_id"])
+            if user is None:
                 # Caso o usuário associado ao winner_id não exista, pule
                 continue
+            user_data.append({
+                "id": user.id,
+                "display_name": user.display_name or user.email,  # Mostra o display_name ou email como fallback
+                "avatar": user.avatar.url if user.avatar else None,
+                "tournaments_won": entry["score"],  # Total de torneios vencidos
+                "position": entry["position"],  # Posição no ranking
+            })
 
         return Response(user_data)
 
+class LeaderboardRankAPIView(APIView):
+    """
+    Posição de um usuário num ranking ("wins" ou "tournaments") e até
+    ?window=N vizinhos de cada lado, sem percorrer a tabela de usuários.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, board, user_id):
+        if board not in leaderboard.BOARDS:
+            return Response({"error": "Ranking inválido."}, status=404)
+        User = get_user_model()
+        try:
+            window = int(request.query_params.get("window", 0))
+        except ValueError:
+            return Response({"error": "window inválido."}, status=400)
+        try:
+            user = User.objects.only("id", "wins").get(id=user_id)
+        except User.DoesNotExist:
+            return Response({"error": "Usuário não encontrado."}, status=404)
+
+        result = user_rank(board, user, window)
+        users = User.objects.in_bulk([entry["user_id"] for entry in result["neighbors"]])
+        for entry in result["neighbors"]:
+            neighbor = users.get(entry["user_id"])
+            entry["display_name"] = neighbor.display_name if neighbor else None
+            entry["avatar"] = neighbor.avatar.url if neighbor and neighbor.avatar else None
+        return Response(result)
+
 class TournamentListAPIView(APIView):
     """
     Lista todos os torneios disponíveis, verifica se o usuário está inscrito e retorna o alias do usuário logado e a quantidade de inscritos.
@@ -474,9 +586,13 @@ class TournamentSetWinnerAPIView(APIView):
                 status=400,
             )
 
-        # Define o vencedor do torneio
-        tournament.winner_id = participant.user_id  # Atualiza com o user_id
-        tournament.save()
+        # Define o vencedor do torneio (UPDATE só de winner/updated_at)
+        set_tournament_winner(tournament.id, participant.user_id)
+        if tournament.winner_id != participant.user_id:
+            try:
+                async_to_sync(leaderboard.record_tournament_win)(participant.user_id, tournament.winner_id)
+            except Exception as e:
+                print(f"Erro ao atualizar o ranking de torneios: {e}")
 
         return Response(
             {
@@ -784,6 +900,7 @@ class MatchFinalizeAPIView(APIView):
     
     OBSERVAÇÃO: Se o match pertencer a um torneio (tournament_id não for nulo),
     o vencedor terá +3 pontos adicionados na tabela game_tournamentparticipant.
+    Uma partida já concluída não é finalizada de novo (409).
     """
     permission_classes = [IsAuthenticated]
 
@@ -800,15 +917,7 @@ class MatchFinalizeAPIView(APIView):
         winner_id = None
 
         if finalization_type == "walkover":
-            if request.user == match.player1:
-                match.score_player1 = 1
-                match.score_player2 = 0
-                winner_id = match.player1.id
-            else:
-                match.score_player1 = 0
-                match.score_player2 = 1
-                winner_id = match.player2.id
-            match.is_winner_by_wo = True
+            winner_id = request.user.id
 
         elif finalization_type == "points":
             threshold = 5
@@ -824,55 +933,21 @@ class MatchFinalizeAPIView(APIView):
         else:
             return Response({"error": "finalization_type inválido."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Debug: imprime o tournament_id do match antes de prosseguir
-        print(f"[DEBUG] match.tournament_id (antes da transação): {match.tournament_id}")
-
+        # Mesma transação usada pelo engine ao fim de uma partida (game/match_finalizer.py)
         try:
-            with transaction.atomic():
-                match.winner_id = winner_id
-                match.status = "completed"
-                match.last_updated = timezone.now()
-                match.played_at = timezone.now()
-                match.save()
-
-                if winner_id == match.player1.id:
-                    loser_id = match.player2.id
-                else:
-                    loser_id = match.player1.id
-
-                User = get_user_model()
-                winner = User.objects.get(pk=winner_id)
-                loser = User.objects.get(pk=loser_id)
-                winner.wins = (winner.wins or 0) + 1
-                loser.losses = (loser.losses or 0) + 1
-                winner.save()
-                loser.save()
-
-                # Se a partida pertence a um torneio, vamos usar o id do match para recuperar o tournament_id
-                if match.tournament_id:
-                    # Re-consulta o match para garantir que estamos usando o valor atual de tournament_id
-                    match_obj = Match.objects.get(pk=match.id)
-                    tournament_id = match_obj.tournament_id
-                    print(f"[DEBUG] tournament_id recuperado: {tournament_id}")
-
-                    try:
-                        participant = TournamentParticipant.objects.get(
-                            tournament_id=tournament_id,
-                            user_id=winner_id
-                        )
-                        print(f"[DEBUG] Antes: participant.points = {participant.points} para user_id {winner_id}")
-                        current_points = participant.points if participant.points is not None else 0
-                        participant.points = current_points + 3
-                        participant.save()
-                        print(f"[DEBUG] Depois: participant.points = {participant.points} para user_id {winner_id}")
-                    except TournamentParticipant.DoesNotExist:
-                        print(f"[DEBUG] TournamentParticipant não encontrado para tournament_id={tournament_id} e user_id={winner_id}")
-                        # Se o registro não existir, você pode optar por criar um ou ignorar
-                        pass
-
+            completed = complete_match(
+                match.id,
+                winner_id,
+                (match.score_player1, match.score_player2),
+                by_wo=finalization_type == "walkover",
+            )
         except Exception as e:
             return Response({"error": f"Erro ao atualizar estatísticas: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        if completed is None:
+            return Response({"error": "Partida já finalizada."}, status=status.HTTP_409_CONFLICT)
+        async_to_sync(leaderboard.record_match)(completed)
+
         return Response({
             "message": "Partida finalizada.",
             "match_id": match.id,
@@ -1035,3 +1110,36 @@ class TournamentAcceptChallengeAPIView(APIView):
             {"message": "Partida do torneio aceita. Conecte-se ao jogo.", "match_id": match.id},
             status=status.HTTP_200_OK,
         )
+
+class RedisPoolStatsAPIView(APIView):
+    """
+    Exibe as métricas do pool asyncio do Redis deste worker (tempo de espera por conexão e ocupação).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_pool_stats(), status=status.HTTP_200_OK)
+
+class EngineStatsAPIView(APIView):
+    """
+    Exibe os contadores de tick (passos, recuperações e estouros) das partidas simuladas por este worker
+    e o fan-out de espectadores dele.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        # O snapshot é montado no event loop que altera as partidas: iterar os
+        # dicionários do engine a partir da thread da view pode falhar no meio
+        stats = async_to_sync(engine_stats)()
+        return Response(stats, status=status.HTTP_200_OK)
+
+class PrometheusMetricsAPIView(APIView):
+    """
+    Exporta no formato texto do Prometheus as métricas publicadas no Redis por todos os engines
+    (partidas por worker, duração do tick, atraso do despertar, envios, Redis e quadros atrasados).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        snapshots = async_to_sync(load_metrics)()
+        return HttpResponse(render_prometheus(snapshots), content_type="text/plain; version=0.0.4; charset=utf-8")
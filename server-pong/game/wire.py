@@ -0,0 +1,74 @@
+import struct
+from urllib.parse import parse_qs
+
+from .match_engine import FIELD_HEIGHT, FIELD_WIDTH
+
+# Formato binário opcional dos quadros de estado do jogo.
+#
+# Layout (little-endian, 27 bytes):
+#   u8  kind          0 = estado sem tick (conexão), 1 = keyframe, 2 = delta
+#   u32 seq
+#   u32 tick
+#   u16 ball_x, u16 ball_y              posições quantizadas em 0..65535
+#   u16 paddle_left, u16 paddle_right
+#   u8  score_left, u8 score_right
+#   u32 ack_left, u32 ack_right         última sequência de entrada aplicada por lado
+#
+# Cada quadro carrega a física completa, então o cliente binário não
+# precisa aplicar deltas: o consumer faz isso antes de codificar.
+
+BINARY_SUBPROTOCOL = "pong.binary"
+
+FRAME_STATE = 0
+FRAME_KEYFRAME = 1
+FRAME_DELTA = 2
+
+STATE_FRAME = struct.Struct("<BIIHHHHBBII")
+QUANT_MAX = 65535
+
+
+def wants_binary(scope):
+    """
+    Verifica se o cliente pediu quadros binários via subprotocolo ou query string (?format=binary).
+    """
+    if BINARY_SUBPROTOCOL in scope.get("subprotocols", []):
+        return True
+    query = parse_qs(scope.get("query_string", b"").decode())
+    return query.get("format", [None])[0] == "binary"
+
+
+def quantize(value, size):
+    return max(0, min(QUANT_MAX, round(value / size * QUANT_MAX)))
+
+
+def apply_delta(base, delta):
+    """
+    Retorna um novo estado com os campos do delta aplicados sobre `base`.
+    """
+    state = dict(base)
+    for key, value in delta.items():
+        if isinstance(value, dict):
+            state[key] = dict(base.get(key, {}), **value)
+        else:
+            state[key] = value
+    return state
+
+
+def encode_state_frame(state, kind):
+    ball = state["ball"]
+    paddles = state["paddles"]
+    scores = state["scores"]
+    acks = state.get("acks") or {}
+    return STATE_FRAME.pack(
+        kind,
+        state.get("seq") or 0,
+        state.get("tick") or 0,
+        quantize(ball["x"], FIELD_WIDTH),
+        quantize(ball["y"], FIELD_HEIGHT),
+        quantize(paddles["left"], FIELD_HEIGHT),
+        quantize(paddles["right"], FIELD_HEIGHT),
+        min(scores["left"], 255),
+        min(scores["right"], 255),
+        acks.get("left", 0) & 0xFFFFFFFF,
+        acks.get("right", 0) & 0xFFFFFFFF,
+    )
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+import weakref
+
+import redis
+from redis import asyncio as aioredis
+from django.conf import settings
+
+# Limites (em segundos) dos buckets do histograma de espera por conexão
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PoolMetrics:
+    """
+    Acumula, por processo, quanto tempo os chamadores esperam para obter
+    uma conexão do pool do Redis.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.buckets = [0] * len(WAIT_BUCKETS)
+
+    def observe(self, waited):
+        self.acquisitions += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        for index, limit in enumerate(WAIT_BUCKETS):
+            if waited <= limit:
+                self.buckets[index] += 1
+                break
+
+    def snapshot(self):
+        return {
+            "acquisitions": self.acquisitions,
+            "timeouts": self.timeouts,
+            "wait_total_seconds": self.wait_total,
+            "wait_avg_seconds": self.wait_total / self.acquisitions if self.acquisitions else 0.0,
+            "wait_max_seconds": self.wait_max,
+            "wait_buckets": {str(limit): count for limit, count in zip(WAIT_BUCKETS, self.buckets)},
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedConnectionPool(aioredis.BlockingConnectionPool):
+    """
+    Pool bloqueante que registra o tempo de espera de cada aquisição de conexão.
+    """
+    async def get_connection(self, command_name, *keys, **options):
+        started = time.monotonic()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except redis.ConnectionError:
+            pool_metrics.timeouts += 1
+            raise
+        pool_metrics.observe(time.monotonic() - started)
+        return connection
+
+
+# Conexões do redis.asyncio ficam presas ao event loop em que foram abertas,
+# então mantemos um pool por loop (na prática, um só por worker do Daphne).
+_pools = weakref.WeakKeyDictionary()
+# Inserções e iterações de _pools podem vir de threads diferentes (views
+# síncronas lendo as estatísticas, async_to_sync criando loops novos).
+_pools_lock = threading.Lock()
+
+
+def _build_pool():
+    config = settings.REDIS_POOL
+    return InstrumentedConnectionPool(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=config["DB"],
+        max_connections=config["MAX_CONNECTIONS"],
+        timeout=config["TIMEOUT"],
+        socket_timeout=config["SOCKET_TIMEOUT"],
+        socket_connect_timeout=config["SOCKET_CONNECT_TIMEOUT"],
+        health_check_interval=config["HEALTH_CHECK_INTERVAL"],
+        decode_responses=True,
+    )
+
+
+def get_redis():
+    """
+    Retorna um cliente asyncio do Redis ligado ao pool compartilhado do processo.
+    Deve ser chamado de dentro de um event loop em execução.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _build_pool()
+        with _pools_lock:
+            _pools[loop] = pool
+    return aioredis.Redis(connection_pool=pool)
+
+
+def install_pool(pool):
+    """
+    Usa `pool` como o pool do event loop atual (simulações e benchmarks com
+    um Redis em memória). Deve ser chamado antes do primeiro `get_redis`.
+    """
+    with _pools_lock:
+        _pools[asyncio.get_running_loop()] = pool
+
+
+def get_pool_stats():
+    """
+    Retorna as métricas de espera por conexão e a ocupação atual dos pools.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+    stats = pool_metrics.snapshot()
+    stats["max_connections"] = settings.REDIS_POOL["MAX_CONNECTIONS"]
+    stats["pools"] = [
+        {
+            "in_use": len(pool._in_use_connections),
+            "available": len(pool._available_connections),
+        }
+        for pool in pools
+    ]
+    return stats
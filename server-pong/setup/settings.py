@@ -121,6 +121,45 @@ CHANNEL_LAYERS = {
     }
 }
 
+# Redis usado diretamente pelos consumers (estado das partidas, cache, etc.)
+REDIS_HOST = os.getenv('REDIS_HOST', 'redis')
+REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
+
+# Pool asyncio compartilhado por processo (ver setup/redis_pool.py)
+REDIS_POOL = {
+    'DB': int(os.getenv('REDIS_DB', 0)),
+    'MAX_CONNECTIONS': int(os.getenv('REDIS_POOL_MAX_CONNECTIONS', 50)),
+    'TIMEOUT': float(os.getenv('REDIS_POOL_TIMEOUT', 5)),  # espera máxima por uma conexão livre
+    'SOCKET_TIMEOUT': float(os.getenv('REDIS_SOCKET_TIMEOUT', 5)),
+    'SOCKET_CONNECT_TIMEOUT': float(os.getenv('REDIS_SOCKET_CONNECT_TIMEOUT', 2)),
+    'HEALTH_CHECK_INTERVAL': int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', 30)),
+}
+
+# Engine das partidas (ver game/match_engine.py)
+GAME_ENGINE = {
+    'TICK_RATE': int(os.getenv('GAME_TICK_RATE', 60)),  # passos de simulação por segundo
+    'BROADCAST_RATE': int(os.getenv('GAME_BROADCAST_RATE', 30)),  # snapshots enviados aos clientes por segundo
+    'KEYFRAME_INTERVAL': int(os.getenv('GAME_KEYFRAME_INTERVAL', 30)),  # envios entre keyframes completos
+    'PHYSICS': os.getenv('GAME_PHYSICS', 'scalar'),  # "scalar" (um loop por partida) ou "batch" (NumPy, um passo para todas)
+    'MAX_STEPS_PER_FRAME': int(os.getenv('GAME_MAX_STEPS_PER_FRAME', 5)),  # limite de passos de recuperação por quadro
+    'PADDLE_MAX_SPEED': float(os.getenv('GAME_PADDLE_MAX_SPEED', 600)),  # pixels/s; movimentos acima disso esperam na fila
+    'SNAPSHOT_INTERVAL': float(os.getenv('GAME_SNAPSHOT_INTERVAL', 1)),  # segundos entre snapshots no Redis
+    'LEASE_TTL': float(os.getenv('GAME_LEASE_TTL', 5)),  # validade do lease de dono da partida
+    'KEY_PREFIX': os.getenv('GAME_KEY_PREFIX', 'pong'),  # chaves pong:match:<id>, pong:matches
+    'STATE_TTL': float(os.getenv('GAME_STATE_TTL', 600)),  # TTL deslizante do estado, renovado a cada snapshot
+    'ABANDON_AFTER': float(os.getenv('GAME_ABANDON_AFTER', 120)),  # segundos sem atividade até o reaper agir
+    'REAPER_INTERVAL': float(os.getenv('GAME_REAPER_INTERVAL', 30)),
+    'ENGINE_HEARTBEAT': float(os.getenv('GAME_ENGINE_HEARTBEAT', 2)),  # segundos entre heartbeats no registro de engines
+    'ENGINE_TTL': float(os.getenv('GAME_ENGINE_TTL', 6)),  # sem heartbeat por esse tempo, o engine sai do anel
+    'RING_VNODES': int(os.getenv('GAME_RING_VNODES', 64)),  # pontos de cada engine no anel de hash consistente
+    'REPLAYS': os.getenv('GAME_REPLAYS', '1') == '1',  # grava inputs e keyframes de cada partida (ver game/replay.py)
+    'REPLAY_DIR': os.getenv('GAME_REPLAY_DIR', 'replays'),  # pasta dos replays dentro do MEDIA_ROOT
+    'REPLAY_MAX_SPEED': float(os.getenv('GAME_REPLAY_MAX_SPEED', 8)),  # maior velocidade aceita na reprodução
+    'SPECTATOR_RATE': int(os.getenv('GAME_SPECTATOR_RATE', 10)),  # quadros por segundo enviados aos espectadores
+    'SPECTATOR_MAX_DELAY': float(os.getenv('GAME_SPECTATOR_MAX_DELAY', 120)),  # maior atraso (s) aceito em ?delay=N
+    'SPECTATOR_HEARTBEAT': float(os.getenv('GAME_SPECTATOR_HEARTBEAT', 5)),  # segundos entre avisos do hub ao engine
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management', '0013_user_current_language'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['wins', 'id'], name='user_wins_idx'),
+        ),
+    ]
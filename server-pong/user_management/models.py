@@ -69,5 +69,11 @@ class User(AbstractBaseUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    class Meta:
+        indexes = [
+            # Ranking de vitórias: top-K e posição (quantos têm mais vitórias)
+            models.Index(fields=['wins', 'id'], name='user_wins_idx'),
+        ]
+
     def __str__(self):
         return self.display_name or self.email  # Prioriza display_name para exibição
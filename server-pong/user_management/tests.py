@@ -1,3 +1,50 @@
+from unittest import mock
+
+import redis
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from game import leaderboard
+from game.tests import FakeRedisMixin, run
+from setup.redis_pool import get_redis
+from .models import User
+
+
+class VictoryRankingTests(FakeRedisMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [
+            User.objects.create(email=f"u{wins}@example.com", display_name=f"U{wins}", wins=wins)
+            for wins in (3, 5, 1)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+    def ranking(self):
+        response = self.client.get(reverse("victory-ranking"))
+        self.assertEqual(response.status_code, 200)
+        return [entry["display_name"] for entry in response.data]
+
+    def test_ranking_comes_from_the_sorted_set(self):
+        self.assertEqual(self.ranking(), ["U5", "U3", "U1"])
+        # Alteração direta no banco não passa pelo Redis: a ordem continua a do sorted set
+        User.objects.filter(pk=self.users[2].pk).update(wins=9)
+        self.assertEqual(self.ranking(), ["U5", "U3", "U1"])
+
+    def test_falls_back_to_the_database_without_redis(self):
+        User.objects.filter(pk=self.users[2].pk).update(wins=9)
+        with mock.patch.object(leaderboard, "top", side_effect=redis.ConnectionError("down")):
+            self.assertEqual(self.ranking(), ["U1", "U5", "U3"])
+
+    def test_deleted_user_leaves_the_rankings(self):
+        self.ranking()
+        user_id = self.users[1].pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[1].delete()
+
+        async def score():
+            return await get_redis().zscore(leaderboard.leaderboard_key(leaderboard.WINS), str(user_id))
 
-# Create your tests here.
+        self.assertIsNone(run(score))
+        self.assertEqual(self.ranking(), ["U3", "U1"])
@@ -28,6 +28,10 @@ from chat.models import Friend, BlockedUser
 from .serializers import UserSerializer, LoginSerializer
 from .utils import generate_2fa_code, send_2fa_code
 
+# Ranking pré-calculado (Redis)
+from game import leaderboard
+from game.stats import ranking_top
+
 class UserRegistrationView(APIView):
     """
     View para registro de usuários.
@@ -374,8 +378,9 @@ class VictoryRankingAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # Ordena os usuários pelo número de vitórias (wins)
-        ranking = User.objects.order_by('-wins')[:10]  # Top 10 usuários
+        # Top 10 por vitórias, do sorted set mantido em game/leaderboard.py (ou do banco)
+        entries = ranking_top(leaderboard.WINS, 10)
+        users = User.objects.in_bulk([entry["user_id"] for entry in entries])
 
         data = [
             {
@@ -385,7 +390,8 @@ class VictoryRankingAPIView(APIView):
                 "wins": user.wins,
                 "losses": user.losses,
             }
-            for user in ranking
+            for user in (users.get(entry["user_id"]) for entry in entries)
+            if user is not None
         ]
         return Response(data, status=200)
 